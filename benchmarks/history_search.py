@@ -0,0 +1,105 @@
+"""Measure history search with filters on a large SQLite history.
+
+Fills a fresh database with --records tasks whose prompts look like real ones
+(about 150 characters, common and rare words), then runs text searches alone
+and combined with model, status and date filters, as the History page does
+for its first page. Prints the median of --repeat runs per query and exits
+with status 1 when the slowest median is over --budget ms.
+
+    python benchmarks/history_search.py --records 100000 --budget 50
+"""
+import argparse
+import datetime
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SUBJECTS = "cat dog castle city forest robot dragon girl boy car street ocean mountain flower".split()
+STYLES = ("cinematic lighting highly detailed photorealistic watercolor oil painting soft focus dramatic "
+          "volumetric fog golden hour neon sunset night anime portrait").split()
+# A long tail of rare words, so terms range from nearly every prompt to a handful
+VOCABULARY = SUBJECTS + STYLES + [f"w{n}x" for n in range(2000)]
+CUM_WEIGHTS = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(VOCABULARY))))
+MODELS = ["nano-banana-fast", "nano-banana", "nano-banana-pro", "sora-image"]
+
+SPRING = {"date_from": "2025-03-01 00:00:00", "date_to": "2025-06-30 23:59:59"}
+QUERIES = [
+    ("cat", {}),
+    ("castle", {}),
+    ("a cat", {}),
+    ("cat", {"model": "nano-banana"}),
+    ("castle", {"model": "nano-banana"}),
+    ("lighting", {"model": "nano-banana"}),
+    ("w100x", {"model": "nano-banana"}),
+    ("cat", SPRING),
+    ("castle", SPRING),
+    ("w100x", SPRING),
+    ("castle", dict(SPRING, model="sora-image")),
+    ("cat lighting", {"model": "nano-banana", "status": "failed"}),
+    ("ca", {"model": "nano-banana"}),
+    ("", SPRING),
+    ("", {"model": "nano-banana"}),
+]
+
+def make_task(rng, i, start):
+    words = []
+    while len(" ".join(words)) < 150:
+        words.extend(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=4))
+    return {
+        "id": f"task-{i}",
+        "prompt": " ".join(words),
+        "model": rng.choice(MODELS),
+        "aspect_ratio": rng.choice(["1:1", "16:9", "9:16"]),
+        "image_size": "1K",
+        "ref_images": None,
+        "api_type": "nano_banana",
+        "status": rng.choice(["succeeded"] * 8 + ["failed", "partial"]),
+        # A task every five minutes, oldest first like a real history
+        "created_at": (start + datetime.timedelta(minutes=5 * i)).strftime("%Y-%m-%d %H:%M:%S"),
+        "result_path": None,
+        "preview_url": None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=9)
+    parser.add_argument("--limit", type=int, default=50, help="Page size")
+    parser.add_argument("--budget", type=float, default=50, help="Maximum median time per query in ms")
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_ROOT)
+    # core.config writes grsai_config.json into the working directory
+    os.chdir(tempfile.mkdtemp(prefix="grsai-bench-search-"))
+    from core.history_storage import SqliteHistoryStorage
+
+    rng = random.Random(1)
+    start = datetime.datetime(2025, 1, 1)
+    storage = SqliteHistoryStorage("grsai_history.db", legacy_path=None)
+    began = time.perf_counter()
+    storage.save(None, [make_task(rng, i, start) for i in range(args.records)])
+    print(f"seeded {args.records} records in {time.perf_counter() - began:.1f}s")
+
+    worst = 0.0
+    for text, filters in QUERIES:
+        times = []
+        for _ in range(args.repeat):
+            began = time.perf_counter()
+            _, total = storage.search(text, 0, args.limit, **filters)
+            times.append(time.perf_counter() - began)
+        median_ms = statistics.median(times) * 1000
+        worst = max(worst, median_ms)
+        label = " ".join([repr(text)] + [f"{key}={value}" for key, value in filters.items()])
+        print(f"{median_ms:7.1f} ms  {total:7} matches  {label}")
+    storage.close()
+    print(f"slowest median {worst:.1f} ms, budget {args.budget:.0f} ms")
+    sys.exit(0 if worst <= args.budget else 1)
+
+if __name__ == "__main__":
+    main()
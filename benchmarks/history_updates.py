@@ -0,0 +1,72 @@
+"""Measure bulk status updates through HistoryManager.
+
+Fills a fresh history with --records tasks for each storage backend, then
+applies --updates status changes to random tasks (like many pollers finishing
+at once) and prints updates per second, including the final flush to disk.
+
+    python benchmarks/history_updates.py --records 50000 --updates 5000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def make_task(i):
+    return {
+        "id": f"task-{i}",
+        "prompt": f"benchmark prompt {i}",
+        "model": "nano-banana-fast",
+        "aspect_ratio": "1:1",
+        "image_size": "1K",
+        "ref_images": None,
+        "api_type": "nano_banana",
+        "status": "running",
+        "created_at": "2025-01-01 00:00:00",
+        "result_path": None,
+        "preview_url": None
+    }
+
+def run(backend, records, updates):
+    from core.history_manager import HistoryManager
+    from core.history_storage import create_storage
+
+    workdir = tempfile.mkdtemp(prefix=f"grsai-bench-{backend}-")
+    os.chdir(workdir)
+    storage = create_storage(backend)
+    # Seed the storage directly, the benchmark is about updates
+    seed = [make_task(i) for i in range(records - 1, -1, -1)]
+    storage.save(seed, seed)
+    manager = HistoryManager(storage)
+    # The history loads lazily, keep the load out of the timed updates
+    manager.get_all_tasks()
+
+    ids = [f"task-{random.randrange(records)}" for _ in range(updates)]
+    start = time.perf_counter()
+    for n, task_id in enumerate(ids):
+        manager.update(task_id, status="succeeded", result_path=f"output/{n}.png")
+    # Include the time to get everything on disk
+    manager.flush()
+    elapsed = time.perf_counter() - start
+    manager.close()
+    print(f"{backend:>7}: {updates} updates on {records} records in {elapsed:.3f}s "
+          f"({updates / elapsed:,.0f} updates/s)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=10000)
+    parser.add_argument("--updates", type=int, default=500)
+    parser.add_argument("--backend", action="append", help="Backend to measure, may be repeated (default: all)")
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_ROOT)
+    # core.config writes grsai_config.json into the working directory
+    os.chdir(tempfile.mkdtemp(prefix="grsai-bench-"))
+    for backend in args.backend or ["json", "sqlite", "journal"]:
+        run(backend, args.records, args.updates)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Measure time from launch to the first painted frame of the GUI.
+
+Starts main.py --runs times with GRSAI_STARTUP_REPORT set, reads the startup
+report it prints on the first paint, then closes it. Prints the report of
+the median run and exits with status 1 when the median is over --budget ms,
+so it can guard time-to-interactive in CI.
+
+    python benchmarks/startup.py --runs 5 --budget 1500
+    QT_QPA_PLATFORM=offscreen python benchmarks/startup.py
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_once(workdir, timeout):
+    env = dict(os.environ, GRSAI_STARTUP_REPORT="1", PYTHONUNBUFFERED="1")
+    proc = subprocess.Popen([sys.executable, os.path.join(REPO_ROOT, "main.py")], cwd=workdir, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    report = []
+    try:
+        for line in proc.stdout:
+            if line.startswith("Startup timings"):
+                report = [line.rstrip()]
+            elif report:
+                report.append(line.rstrip())
+                if line.strip().startswith("first paint"):
+                    break
+    finally:
+        proc.kill()
+        proc.wait(timeout)
+    if not report or not report[-1].strip().startswith("first paint"):
+        raise RuntimeError("main.py exited without a startup report")
+    # "  first paint   28.8  at   693.9"
+    return float(report[-1].split()[-1]), report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=1500, help="Maximum median time to first paint in ms")
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args()
+
+    # Like a first launch: no config or history in the working directory yet
+    workdir = tempfile.mkdtemp(prefix="grsai-bench-startup-")
+    runs = [run_once(workdir, args.timeout) for _ in range(args.runs)]
+    runs.sort(key=lambda run: run[0])
+    median_ms, report = runs[len(runs) // 2]
+    print("\n".join(report))
+    print(f"first paint: median {median_ms:.0f} ms over {args.runs} runs "
+          f"(min {runs[0][0]:.0f}, max {runs[-1][0]:.0f}), budget {args.budget:.0f} ms")
+    sys.exit(0 if median_ms <= args.budget else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Run tasks in webhook mode against a local fake Grsai server.
+
+The fake server accepts submissions, answers every result poll with
+"running", and posts a progress callback and then the completion callback
+to the webHook URL it was given, --delay seconds after the submit. With
+--no-callback it never calls back, so the tasks only finish once the engine
+falls back to polling after webhook_timeout.
+
+Prints the time from submit to the saved image and the number of result
+polls, and exits with status 1 when a task failed, took more than --budget
+seconds, or was polled although the callback arrived.
+
+    python benchmarks/webhook_roundtrip.py --tasks 5 --delay 0.5
+    python benchmarks/webhook_roundtrip.py --no-callback --webhook-timeout 2
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A valid 1x1 PNG, the engine sniffs the type of what it downloads
+IMAGE = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000001e221bc330000000049454e44ae426082")
+
+class FakeGrsai:
+    """Fake /v1/draw endpoints that complete tasks through webhook callbacks only."""
+
+    def __init__(self, delay, callback=True):
+        self.delay = delay
+        self.callback = callback
+        self.polls = 0
+        self._ids = itertools.count(1)
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+                if self.path == "/v1/draw/result":
+                    fake.polls += 1
+                    if fake.callback:
+                        self._reply({"code": 0, "data": {"id": body["id"], "status": "running", "progress": 10}})
+                    else:
+                        self._reply({"code": 0, "data": fake.result(body["id"])})
+                    return
+                task_id = f"fake-{next(fake._ids)}"
+                if fake.callback and body.get("webHook") not in (None, "-1"):
+                    threading.Thread(target=fake.call_back, args=(body["webHook"], task_id), daemon=True).start()
+                self._reply({"code": 0, "data": {"id": task_id}})
+
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(IMAGE)))
+                self.end_headers()
+                self.wfile.write(IMAGE)
+
+            def _reply(self, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def result(self, task_id):
+        return {"id": task_id, "status": "succeeded", "progress": 100,
+                "results": [{"url": f"{self.url}/images/{task_id}.png"}]}
+
+    def call_back(self, url, task_id):
+        time.sleep(self.delay / 2)
+        self._post(url, {"id": task_id, "status": "running", "progress": 50})
+        time.sleep(self.delay / 2)
+        # Real callbacks wrap the data like /v1/draw/result does
+        self._post(url, {"code": 0, "data": self.result(task_id)})
+
+    def _post(self, url, payload):
+        request = urllib.request.Request(url, json.dumps(payload).encode(), {"Content-Type": "application/json"})
+        try:
+            urllib.request.urlopen(request, timeout=10).close()
+        except OSError as e:
+            print(f"Callback to {url} failed: {e}")
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=3)
+    parser.add_argument("--delay", type=float, default=0.5, help="Seconds from submit to the completion callback")
+    parser.add_argument("--no-callback", action="store_true", help="Never call back, tasks must fall back to polling")
+    parser.add_argument("--webhook-timeout", type=float, default=5.0)
+    parser.add_argument("--budget", type=float, help="Maximum seconds per task (default: delay + 1, "
+                        "or webhook timeout + 5 with --no-callback)")
+    args = parser.parse_args()
+    budget = args.budget
+    if budget is None:
+        budget = args.webhook_timeout + 5 if args.no_callback else args.delay + 1
+
+    sys.path.insert(0, REPO_ROOT)
+    # core.config and the history write into the working directory
+    workdir = tempfile.mkdtemp(prefix="grsai-bench-webhook-")
+    os.chdir(workdir)
+    from core.config import cfg
+    from core.task_engine import nano_banana_job, task_engine
+
+    fake = FakeGrsai(args.delay, callback=not args.no_callback)
+    cfg.override("api_base_url", fake.url)
+    cfg.override("api_key", "fake")
+    cfg.override("output_folder", os.path.join(workdir, "output"))
+    cfg.override("webhook_enabled", True)
+    cfg.override("webhook_host", "127.0.0.1")
+    cfg.override("webhook_timeout", args.webhook_timeout)
+
+    start = time.perf_counter()
+    futures = [task_engine.submit(nano_banana_job(f"webhook test {i}", "nano-banana-fast")) for i in range(args.tasks)]
+    results = [future.result(timeout=budget + 30) for future in futures]
+    elapsed = time.perf_counter() - start
+    task_engine.stop()
+    fake.stop()
+
+    failed = [result for result in results if not result["success"]]
+    for result in failed:
+        print(f"{result['id']}: {result['msg']}")
+    mode = "polling fallback" if args.no_callback else "callbacks"
+    print(f"{args.tasks} tasks via {mode} in {elapsed:.2f}s (budget {budget:.2f}s), {fake.polls} result polls")
+    ok = not failed and elapsed <= budget and (args.no_callback or fake.polls == 0)
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
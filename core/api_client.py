@@ -1,7 +1,35 @@
 import requests
 import json
+import threading
+from requests.adapters import HTTPAdapter
 from core.config import cfg
 
+_http_session = None
+_http_session_lock = threading.Lock()
+
+def get_http_session():
+    """Shared keep-alive session used by both API clients and result downloads.
+
+    The connection pool is built once from the config:
+    - http_pool_connections: number of hosts whose pools are kept alive
+    - http_pool_maxsize: max open connections per host
+    - http_pool_block: wait for a free connection instead of opening extra ones
+    """
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=cfg.get("http_pool_connections"),
+                    pool_maxsize=cfg.get("http_pool_maxsize"),
+                    pool_block=cfg.get("http_pool_block")
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _http_session = session
+    return _http_session
+
 class NanoBananaApiClient:
     def __init__(self):
         pass
@@ -12,7 +40,7 @@ class NanoBananaApiClient:
             "Authorization": f"Bearer {cfg.get('api_key')}"
         }
 
-    def submit_task(self, prompt, model, aspect_ratio="auto", image_size="1K", ref_image_urls=None):
+    def submit_task(self, prompt, model, aspect_ratio="auto", image_size="1K", ref_image_urls=None, web_hook="-1"):
         url = f"{cfg.get('api_base_url').rstrip('/')}/v1/draw/nano-banana"
         
         payload = {
@@ -20,7 +48,7 @@ class NanoBananaApiClient:
             "prompt": prompt,
             "aspectRatio": aspect_ratio,
             "imageSize": image_size,
-            "webHook": "-1",  # Use -1 to get ID immediately for polling
+            "webHook": web_hook,  # -1 returns the ID immediately for polling, a URL receives callbacks
             "shutProgress": False
         }
 
@@ -28,7 +56,7 @@ class NanoBananaApiClient:
             payload["urls"] = ref_image_urls
 
         try:
-            response = requests.post(url, headers=self.get_headers(), json=payload, timeout=30)
+            response = get_http_session().post(url, headers=self.get_headers(), json=payload, timeout=30)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -39,7 +67,7 @@ class NanoBananaApiClient:
         payload = {"id": task_id}
 
         try:
-            response = requests.post(url, headers=self.get_headers(), json=payload, timeout=30)
+            response = get_http_session().post(url, headers=self.get_headers(), json=payload, timeout=30)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -55,7 +83,7 @@ class GptImageClient:
             "Authorization": f"Bearer {cfg.get('api_key')}"
         }
 
-    def submit_task(self, prompt, model="sora-image", size="1:1", variants=1, ref_image_urls=None):
+    def submit_task(self, prompt, model="sora-image", size="1:1", variants=1, ref_image_urls=None, web_hook="-1"):
         url = f"{cfg.get('api_base_url').rstrip('/')}/v1/draw/completions"
         
         payload = {
@@ -63,7 +91,7 @@ class GptImageClient:
             "prompt": prompt,
             "size": size,
             "variants": variants,
-            "webHook": "-1",  # Use -1 to get ID immediately for polling
+            "webHook": web_hook,  # -1 returns the ID immediately for polling, a URL receives callbacks
             "shutProgress": False
         }
 
@@ -71,7 +99,7 @@ class GptImageClient:
             payload["urls"] = ref_image_urls
 
         try:
-            response = requests.post(url, headers=self.get_headers(), json=payload, timeout=30)
+            response = get_http_session().post(url, headers=self.get_headers(), json=payload, timeout=30)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -82,7 +110,7 @@ class GptImageClient:
         payload = {"id": task_id}
 
         try:
-            response = requests.post(url, headers=self.get_headers(), json=payload, timeout=30)
+            response = get_http_session().post(url, headers=self.get_headers(), json=payload, timeout=30)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
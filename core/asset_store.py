@@ -0,0 +1,152 @@
+import base64
+import hashlib
+import os
+import re
+import threading
+
+from core.config import cfg
+
+ASSET_DIR = 'grsai_assets'
+
+EXTENSION_MIME = {"png": "png", "jpg": "jpeg", "jpeg": "jpeg", "webp": "webp"}
+MIME_EXTENSION = {"png": "png", "jpeg": "jpg", "webp": "webp"}
+HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+def sniff_mime(data):
+    """Image subtype from the file header, None if it is not a supported image."""
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if data.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+def to_data_uri(data, mime):
+    return f"data:image/{mime};base64,{base64.b64encode(data).decode('utf-8')}"
+
+def _write_atomic(path, data, mode="wb"):
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, mode) as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+class AssetStore:
+    """Content-addressed store for reference images.
+
+    Each image is kept once as files/<sha256>.<ext>, whatever path, paste or
+    drop it came from, and history records refer to it by that hash. The
+    base64 data URI sent to the API is memoized as payloads/<sha256>.txt;
+    payloads are evicted least recently used first once they exceed
+    asset_payload_cache_mb. Image files are never evicted since history
+    points at them.
+    """
+
+    def __init__(self, root=ASSET_DIR):
+        self.root = root
+        self.files_dir = os.path.join(root, "files")
+        self.payload_dir = os.path.join(root, "payloads")
+        self._lock = threading.Lock()
+        self._known = {}  # (path, mtime, size) -> hash, skips re-hashing unchanged files
+
+    def _ensure_dirs(self):
+        os.makedirs(self.files_dir, exist_ok=True)
+        os.makedirs(self.payload_dir, exist_ok=True)
+
+    def is_hash(self, ref):
+        return isinstance(ref, str) and HASH_PATTERN.match(ref) is not None
+
+    def path_for(self, asset_hash):
+        for ext in MIME_EXTENSION.values():
+            path = os.path.join(self.files_dir, f"{asset_hash}.{ext}")
+            if os.path.exists(path):
+                return path
+        return None
+
+    def resolve(self, ref):
+        """Turn a history reference (hash or legacy file path) into a file path."""
+        if self.is_hash(ref):
+            return self.path_for(ref)
+        return ref
+
+    def put_bytes(self, data, ext=None):
+        """Store image bytes and return their hash. Raises ValueError for non-images."""
+        mime = sniff_mime(data) or EXTENSION_MIME.get((ext or "").lower().lstrip('.'))
+        if mime is None:
+            raise ValueError("not a PNG, JPEG or WebP image")
+        asset_hash = hashlib.sha256(data).hexdigest()
+        if self.path_for(asset_hash) is None:
+            self._ensure_dirs()
+            _write_atomic(os.path.join(self.files_dir, f"{asset_hash}.{MIME_EXTENSION[mime]}"), data)
+        return asset_hash
+
+    def put_file(self, path):
+        """Store a file and return (hash, bytes). bytes is None when the file was
+        already known and did not need to be read."""
+        path = os.path.abspath(path)
+        # Files that already live in the store are named by their hash
+        if os.path.dirname(path) == os.path.abspath(self.files_dir):
+            return os.path.splitext(os.path.basename(path))[0], None
+
+        st = os.stat(path)
+        key = (path, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            asset_hash = self._known.get(key)
+        if asset_hash and self.path_for(asset_hash):
+            return asset_hash, None
+
+        with open(path, "rb") as f:
+            data = f.read()
+        asset_hash = self.put_bytes(data, os.path.splitext(path)[1])
+        with self._lock:
+            self._known[key] = asset_hash
+        return asset_hash, data
+
+    def data_uri(self, asset_hash, data=None):
+        """Return the encoded data URI for a stored image, from the payload cache when possible."""
+        payload_path = os.path.join(self.payload_dir, f"{asset_hash}.txt")
+        try:
+            with open(payload_path, "r", encoding="utf-8") as f:
+                uri = f.read()
+            os.utime(payload_path)  # Mark as recently used
+            return uri
+        except FileNotFoundError:
+            pass
+
+        path = self.path_for(asset_hash)
+        if path is None:
+            raise FileNotFoundError(f"Asset {asset_hash} is not in the store")
+        if data is None:
+            with open(path, "rb") as f:
+                data = f.read()
+        uri = to_data_uri(data, EXTENSION_MIME[os.path.splitext(path)[1].lstrip('.')])
+
+        self._ensure_dirs()
+        _write_atomic(payload_path, uri, "w")
+        self._evict_payloads()
+        return uri
+
+    def _evict_payloads(self):
+        limit = cfg.get("asset_payload_cache_mb") * 1024 * 1024
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.payload_dir):
+                if not entry.name.endswith(".txt"):
+                    continue
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+            if total <= limit:
+                return
+            entries.sort()
+            for _, size, path in entries:
+                if total <= limit:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+asset_store = AssetStore()
@@ -0,0 +1,208 @@
+import asyncio
+import csv
+import json
+import os
+import re
+import time
+
+from core.config import cfg
+from core.task_engine import task_engine, nano_banana_job, gpt_image_job, notify_listener
+from core.reference_encoder import prepare_references
+
+def _split_refs(value):
+    if not value:
+        return []
+    if isinstance(value, list):
+        return [str(v).strip() for v in value if str(v).strip()]
+    # CSV cells hold several paths separated by ; or |
+    return [p.strip() for p in re.split(r"[;|\n]", str(value)) if p.strip()]
+
+def _text(row, key):
+    value = row.get(key)
+    if value is None:
+        return ""
+    if not isinstance(value, str):
+        raise ValueError(f"{key} must be a string")
+    return value.strip()
+
+def row_to_job(row, base_dir="."):
+    """Build a task engine job from one batch row.
+
+    Recognised keys: prompt (required), api_type, model, aspect_ratio,
+    image_size, size, variants, ref_images. Missing values fall back to the
+    last settings used in the GUI. api_type defaults to gpt_image for sora
+    models and nano_banana otherwise. Relative reference paths are resolved
+    against base_dir.
+    """
+    if not isinstance(row, dict):
+        raise ValueError("expected an object with a prompt")
+    prompt = _text(row, "prompt")
+    if not prompt:
+        raise ValueError("missing prompt")
+
+    model = _text(row, "model")
+    api_type = _text(row, "api_type")
+    if not api_type:
+        api_type = "gpt_image" if model.startswith("sora") else "nano_banana"
+
+    refs = [p if os.path.isabs(p) else os.path.join(base_dir, p) for p in _split_refs(row.get("ref_images"))]
+
+    if api_type == "gpt_image":
+        variants = int(row.get("variants") or cfg.get("gpt_image_last_variants"))
+        return gpt_image_job(prompt, model or cfg.get("gpt_image_last_model"), row.get("size") or cfg.get("gpt_image_last_size"),
+                             variants, None, refs)
+    if api_type == "nano_banana":
+        return nano_banana_job(prompt, model or cfg.get("nano_banana_last_model"),
+                               row.get("aspect_ratio") or cfg.get("nano_banana_last_aspect_ratio"),
+                               row.get("image_size") or cfg.get("nano_banana_last_image_size"), None, refs)
+    raise ValueError(f"unknown api_type {api_type}")
+
+def load_batch_file(path):
+    """Read a .csv (header row) or .jsonl (one object per line) file into jobs.
+
+    Raises ValueError naming the offending line.
+    """
+    base_dir = os.path.dirname(os.path.abspath(path))
+    ext = os.path.splitext(path)[1].lower()
+    jobs = []
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if ext == ".jsonl":
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    jobs.append(row_to_job(json.loads(line), base_dir))
+                except ValueError as e:
+                    raise ValueError(f"{path} line {line_no}: {e}") from e
+        elif ext == ".csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                try:
+                    jobs.append(row_to_job(row, base_dir))
+                except ValueError as e:
+                    raise ValueError(f"{path} line {reader.line_num}: {e}") from e
+        else:
+            raise ValueError(f"Unsupported batch file type {ext}, use .csv or .jsonl")
+    return jobs
+
+class TokenBucket:
+    """Async token bucket: rate tokens per second, bursts of up to capacity."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class BatchRunner:
+    """Runs many jobs through the task engine.
+
+    At most max_concurrent rows are in flight (preparing references, waiting
+    for the server or downloading) and submits are spaced by a token bucket
+    of submits_per_minute (0 = unlimited). Call run() on the engine loop, e.g.
+    task_engine.run(runner.run()).
+
+    A listener may implement on_row_finished(index, result) and
+    on_batch_finished(stats), both called on the engine thread; it also
+    receives the task engine callbacks of every row. stats() can be
+    read from any thread.
+    """
+
+    def __init__(self, jobs, max_concurrent=None, submits_per_minute=None, listener=None):
+        self.jobs = jobs
+        self.max_concurrent = max_concurrent or cfg.get("batch_max_concurrent")
+        if submits_per_minute is None:
+            submits_per_minute = cfg.get("batch_submits_per_minute")
+        self.bucket = TokenBucket(submits_per_minute / 60) if submits_per_minute else None
+        self.listener = listener
+        self.results = [None] * len(jobs)
+        self.cancelled = False
+        self.started_at = None
+        self.finished_at = None
+        self.running = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.skipped = 0
+        self.images = 0
+
+    def cancel(self):
+        """Stop starting new rows; rows already submitted run to completion."""
+        self.cancelled = True
+
+    def stats(self):
+        if self.started_at is None:
+            elapsed = 0
+        else:
+            elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        return {
+            "total": len(self.jobs),
+            "done": self.succeeded + self.failed + self.skipped,
+            "running": self.running,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "images": self.images,
+            "elapsed": elapsed,
+            "images_per_minute": self.images * 60 / elapsed if elapsed else 0.0
+        }
+
+    async def run(self):
+        self.started_at = time.monotonic()
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        async def run_row(index, job):
+            async with semaphore:
+                result = None
+                if not self.cancelled:
+                    self.running += 1
+                    try:
+                        result = await self._run_job(job)
+                    except Exception as e:
+                        result = {"id": None, "success": False, "result_path": "", "result_paths": [], "msg": str(e)}
+                    finally:
+                        self.running -= 1
+                if result is None:
+                    result = {"id": None, "success": False, "result_path": "", "result_paths": [], "msg": "Cancelled"}
+                    self.skipped += 1
+                elif result["success"]:
+                    self.succeeded += 1
+                    self.images += len(result["result_paths"])
+                else:
+                    self.failed += 1
+            self.results[index] = result
+            notify_listener(self.listener, "on_row_finished", index, result)
+
+        await asyncio.gather(*(run_row(i, job) for i, job in enumerate(self.jobs)))
+        self.finished_at = time.monotonic()
+        notify_listener(self.listener, "on_batch_finished", self.stats())
+        return self.results
+
+    async def _run_job(self, job):
+        # Returns None when the batch was cancelled before the row was submitted
+        if job["ref_images"]:
+            loop = asyncio.get_running_loop()
+            ref_urls, ref_hashes, errors = await loop.run_in_executor(None, prepare_references, job["ref_images"])
+            if errors:
+                # Unlike the GUI there is nobody to notice a silently dropped reference
+                return {"id": None, "success": False, "result_path": "", "result_paths": [], "msg": "; ".join(errors)}
+            job["ref_urls"] = ref_urls
+            job["ref_images"] = ref_hashes
+
+        if self.bucket is not None:
+            await self.bucket.acquire()
+            if self.cancelled:
+                # Cancelled while waiting for a submit slot
+                return None
+        return await task_engine.run_job(job, self.listener)
@@ -0,0 +1,161 @@
+"""Headless command line mode: python main.py generate ... / python main.py batch ...
+
+Uses the same task engine, history and output folder as the GUI but never
+imports PySide6 or qfluentwidgets. Every finished task is printed to stdout as
+one JSON object per line; progress goes to stderr.
+
+Exit codes: 0 all tasks succeeded, 1 at least one task failed,
+2 invalid arguments or batch file, 130 interrupted.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+
+from core.config import cfg
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+_print_lock = threading.Lock()
+
+def _emit(record):
+    with _print_lock:
+        sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+
+def _log(args, message):
+    if not args.quiet:
+        with _print_lock:
+            sys.stderr.write(message + "\n")
+            sys.stderr.flush()
+
+def _task_record(job, result):
+    return {
+        "id": result["id"],
+        "success": result["success"],
+        "api_type": job["api_type"],
+        "model": job["model"],
+        "prompt": job["prompt"],
+        "result_paths": result["result_paths"],
+        "msg": result["msg"]
+    }
+
+class _ProgressListener:
+    def __init__(self, args):
+        self.args = args
+
+    def on_submitted(self, result):
+        if result.get("code") == 0:
+            _log(self.args, f"{result['data']['id']}: submitted")
+
+    def on_update(self, task_id, progress, status):
+        _log(self.args, f"{task_id}: {status} {progress}%")
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--api-key", help="API key for this run (default: grsai_config.json or GRSAI_API_KEY)")
+    common.add_argument("--base-url", help="API base URL for this run")
+    common.add_argument("--output", help="Output folder for this run")
+    common.add_argument("-q", "--quiet", action="store_true", help="Do not print progress to stderr")
+
+    parser = argparse.ArgumentParser(prog="main.py", description="Grsai image generation without the GUI.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    gen = subparsers.add_parser("generate", parents=[common], help="Generate images for one prompt")
+    gen.add_argument("prompt")
+    gen.add_argument("--api", choices=["nano_banana", "gpt_image"], default="nano_banana")
+    gen.add_argument("--model", help="Model name (default: last model used in the GUI)")
+    gen.add_argument("--aspect-ratio", help="Nano Banana aspect ratio, e.g. 16:9")
+    gen.add_argument("--image-size", choices=["1K", "2K", "4K"], help="Nano Banana image size")
+    gen.add_argument("--size", help="GPT Image size, e.g. 3:2")
+    gen.add_argument("--variants", type=int, help="GPT Image variants")
+    gen.add_argument("--ref", action="append", default=[], metavar="PATH", help="Reference image, may be repeated")
+
+    batch = subparsers.add_parser("batch", parents=[common], help="Run every row of a CSV or JSONL file")
+    batch.add_argument("file")
+    batch.add_argument("--max-concurrent", type=int, help="Max tasks in flight")
+    batch.add_argument("--rate", type=int, help="Max submits per minute, 0 = unlimited")
+    return parser
+
+def _apply_overrides(args):
+    api_key = args.api_key or os.environ.get("GRSAI_API_KEY")
+    if api_key:
+        cfg.override("api_key", api_key)
+    if args.base_url:
+        cfg.override("api_base_url", args.base_url)
+    if args.output:
+        cfg.override("output_folder", os.path.abspath(args.output))
+
+def _generate(args):
+    from core.batch_runner import row_to_job, BatchRunner
+    from core.task_engine import task_engine
+
+    row = {
+        "prompt": args.prompt,
+        "api_type": args.api,
+        "model": args.model,
+        "aspect_ratio": args.aspect_ratio,
+        "image_size": args.image_size,
+        "size": args.size,
+        "variants": args.variants,
+        "ref_images": [os.path.abspath(p) for p in args.ref]
+    }
+    try:
+        job = row_to_job(row)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    # A one-row batch gets reference preparation and error handling for free
+    runner = BatchRunner([job], 1, 0, _ProgressListener(args))
+    results = task_engine.run(runner.run()).result()
+    _emit(_task_record(job, results[0]))
+    return EXIT_OK if results[0]["success"] else EXIT_FAILED
+
+def _batch(args):
+    from core.batch_runner import load_batch_file, BatchRunner
+    from core.task_engine import task_engine
+
+    try:
+        jobs = load_batch_file(args.file)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    class Listener(_ProgressListener):
+        def on_row_finished(self, index, result):
+            record = _task_record(jobs[index], result)
+            record["row"] = index + 1
+            _emit(record)
+
+        def on_batch_finished(self, stats):
+            _log(args, f"done: {stats['succeeded']} succeeded, {stats['failed']} failed, "
+                       f"{stats['images']} images, {stats['images_per_minute']:.1f} images/min")
+
+    runner = BatchRunner(jobs, args.max_concurrent, args.rate, Listener(args))
+    future = task_engine.run(runner.run())
+    try:
+        results = future.result()
+    except KeyboardInterrupt:
+        runner.cancel()
+        _log(args, "interrupted, waiting for submitted tasks to finish (Ctrl+C again to quit)")
+        try:
+            future.result()
+        except KeyboardInterrupt:
+            return EXIT_INTERRUPTED
+        return EXIT_INTERRUPTED
+    return EXIT_OK if all(r["success"] for r in results) else EXIT_FAILED
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    _apply_overrides(args)
+    try:
+        if args.command == "generate":
+            return _generate(args)
+        return _batch(args)
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
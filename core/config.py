@@ -1,6 +1,8 @@
 import json
 import os
 
+from core.startup_timer import startup_timer
+
 CONFIG_FILE = 'grsai_config.json'
 
 DEFAULT_CONFIG = {
@@ -12,23 +14,55 @@ DEFAULT_CONFIG = {
     "nano_banana_last_image_size": "1K",
     "gpt_image_last_model": "sora-image",
     "gpt_image_last_size": "1:1",
-    "gpt_image_last_variants": 1
+    "gpt_image_last_variants": 1,
+    "http_pool_connections": 4,
+    "http_pool_maxsize": 16,
+    "http_pool_block": True,
+    "engine_max_workers": 8,
+    "poll_min_interval": 1.0,
+    "poll_max_interval": 8.0,
+    "poll_backoff_max": 30.0,
+    "webhook_enabled": False,
+    "webhook_host": "127.0.0.1",
+    "webhook_port": 0,
+    "webhook_public_url": "",
+    "webhook_timeout": 60.0,
+    "download_retries": 3,
+    "download_chunk_size": 65536,
+    "download_concurrency": 4,
+    "download_part_max_age_hours": 24,  # Older .part files in the output folder are removed at engine start
+    "preview_partial_interval": 0.5,  # Seconds between previews of a download in progress, 0 turns them off
+    "reference_workers": 4,
+    "asset_payload_cache_mb": 256,
+    "batch_max_concurrent": 4,
+    "batch_submits_per_minute": 30,
+    "history_backend": "sqlite",
+    "history_write_delay": 0.5,
+    "history_compact_lines": 5000,
+    "thumbnail_cache_mb": 64,
+    "image_cache_mb": 256,
+    "startup_budget_ms": 1500
 }
 
 class Config:
     def __init__(self):
         self.data = self.load_config()
+        # Values changed for this process only, e.g. by command line options
+        self.overrides = {}
 
     def load_config(self):
         if not os.path.exists(CONFIG_FILE):
             self.save_config(DEFAULT_CONFIG)
-            return DEFAULT_CONFIG
+            return dict(DEFAULT_CONFIG)
         
         try:
             with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
+                data = dict(DEFAULT_CONFIG)
+                # Keys added in newer versions fall back to their defaults
+                data.update(json.load(f))
+                return data
         except:
-            return DEFAULT_CONFIG
+            return dict(DEFAULT_CONFIG)
 
     def save_config(self, data=None):
         if data is None:
@@ -37,10 +71,17 @@ class Config:
             json.dump(data, f, indent=4, ensure_ascii=False)
 
     def get(self, key, default=None):
+        if key in self.overrides:
+            return self.overrides[key]
         return self.data.get(key, default)
 
     def set(self, key, value):
         self.data[key] = value
         self.save_config()
 
-cfg = Config()
+    def override(self, key, value):
+        """Use value for key until the process exits without saving it."""
+        self.overrides[key] = value
+
+with startup_timer.phase("config"):
+    cfg = Config()
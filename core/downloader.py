@@ -0,0 +1,110 @@
+import os
+import re
+import time
+
+import requests
+
+from core.config import cfg
+from core.api_client import get_http_session
+
+class DownloadError(Exception):
+    pass
+
+def _expected_total(response, offset):
+    # A ranged response reports the full size in Content-Range: bytes 100-999/1000
+    content_range = response.headers.get("Content-Range")
+    if content_range:
+        match = re.search(r"/(\d+)$", content_range)
+        if match:
+            return int(match.group(1))
+    # Content-Length of an encoded body does not match the decoded bytes we write
+    if response.headers.get("Content-Encoding", "identity") != "identity":
+        return None
+    length = response.headers.get("Content-Length")
+    if length is None:
+        return None
+    return offset + int(length)
+
+def remove_stale_parts(folder, max_age):
+    """Delete .part files in folder last written more than max_age seconds ago.
+
+    Downloads cut off for good, e.g. by closing the app, leave them behind;
+    a running download writes its file far more often. Returns how many
+    files were removed.
+    """
+    try:
+        entries = list(os.scandir(folder))
+    except OSError:
+        return 0
+    cutoff = time.time() - max_age
+    removed = 0
+    for entry in entries:
+        if not entry.name.endswith(".part"):
+            continue
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError:
+            # Gone already or still held open by another process
+            continue
+    return removed
+
+def download_file(url, dest_path, on_progress=None, retries=None, timeout=60):
+    """Stream url into dest_path without holding the body in memory.
+
+    Bytes go to dest_path + ".part". After a dropped connection the download
+    resumes from the end of that file with an HTTP Range request. The size is
+    checked against Content-Length/Content-Range and the file is only renamed
+    into place once complete, so dest_path never holds a partial image.
+
+    on_progress(received, total) is called as chunks arrive; total is None when
+    the server does not say how big the file is.
+    """
+    if retries is None:
+        retries = cfg.get("download_retries")
+    chunk_size = cfg.get("download_chunk_size")
+    part_path = dest_path + ".part"
+    session = get_http_session()
+
+    attempt = 0
+    while True:
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                if response.status_code == 416:
+                    # Our partial file does not match the remote one, start over
+                    os.remove(part_path)
+                    raise DownloadError("Requested range not satisfiable")
+                response.raise_for_status()
+
+                if offset and response.status_code != 206:
+                    # Server ignored the Range header and sent the whole file
+                    offset = 0
+                total = _expected_total(response, offset)
+
+                received = offset
+                with open(part_path, "ab" if offset else "wb") as f:
+                    for chunk in response.iter_content(chunk_size):
+                        if not chunk:
+                            continue
+                        f.write(chunk)
+                        received += len(chunk)
+                        if on_progress:
+                            on_progress(received, total)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            if total is not None and received != total:
+                raise DownloadError(f"Incomplete download: got {received} of {total} bytes")
+
+            os.replace(part_path, dest_path)
+            return dest_path
+        except (requests.exceptions.RequestException, DownloadError) as e:
+            attempt += 1
+            if attempt > retries:
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+                raise DownloadError(f"Download failed after {attempt} attempts: {e}") from e
+            time.sleep(min(2 ** attempt, 10))
@@ -1,25 +1,215 @@
-import json
-import os
+import atexit
+import threading
+import time
 from datetime import datetime
 
-HISTORY_FILE = 'grsai_history.json'
+from core.config import cfg
+from core.startup_timer import startup_timer
+from core.history_storage import create_storage, SqliteHistoryStorage
 
 class HistoryManager:
-    def __init__(self):
-        self.history = self.load_history()
+    """In-memory task history, safe to use from any thread.
+
+    Changes are applied under a lock and persisted by a background writer,
+    which waits history_write_delay seconds after the first change so a burst
+    of updates ends up in one write. flush() writes pending changes right away
+    and runs automatically at interpreter exit.
+
+    The records are read into memory on first use, or in the background
+    after start_loading(); methods that need them wait until they are in.
+    on_ready() registers callbacks for that moment. With the SQLite backend
+    search() and distinct() query the database directly, waiting only while a
+    first load imports the legacy JSON history; the flat-file backends are
+    searched through an in-memory SQLite copy that is built on its own thread
+    afterwards, see on_searchable().
+    """
+
+    def __init__(self, storage=None):
+        self.storage = storage or create_storage(cfg.get("history_backend"))
+        self.lock = threading.RLock()
+        self.history = []
+        # id -> task record, the same dicts as in self.history
+        self.index = {}
+        # Flat-file backends are searched through an in-memory SQLite copy, built once loaded
+        self.search_index = self.storage if getattr(self.storage, "searchable", False) else None
+        self._unindexed = {}  # Changes made while the search index is being built
+        self._loaded = threading.Event()
+        self._searchable = threading.Event()
+        # Until a first load() has imported the legacy JSON history, the database is empty
+        if self.search_index is not None and not self.search_index.pending_import():
+            self._searchable.set()
+        self._load_lock = threading.Lock()
+        self._load_thread = None
+        self._load_error = None
+        self._search_error = None
+        self._ready_callbacks = []
+        self._searchable_callbacks = []
+        self._dirty = {}
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._writer = threading.Thread(target=self._writer_loop, name="grsai-history-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
 
     def load_history(self):
-        if not os.path.exists(HISTORY_FILE):
-            return []
+        return self.storage.load()
+
+    def start_loading(self):
+        """Read the history on a background thread instead of on first use."""
+        with self._load_lock:
+            if self._load_thread is None and not self._loaded.is_set():
+                self._load_thread = threading.Thread(target=self._load, name="grsai-history-loader", daemon=True)
+                self._load_thread.start()
+
+    def _load(self):
+        try:
+            with startup_timer.phase("history"):
+                history = self.load_history()
+                index = {task["id"]: task for task in reversed(history)}
+            with self.lock:
+                self.history = history
+                self.index = index
+        except Exception as e:
+            # Kept to raise in every caller, so a broken history is never saved over as empty
+            print(f"Loading history failed: {e}")
+            self._load_error = e
+        self._loaded.set()
+        if not self._searchable.is_set():
+            if self._load_error is None and self.search_index is None:
+                threading.Thread(target=self._build_search_index, name="grsai-history-indexer", daemon=True).start()
+            else:
+                # The database has its legacy history imported now, or the load failed
+                self._search_error = self._load_error
+                self._set_event(self._searchable, "_searchable_callbacks")
+        self._set_event(self._loaded, "_ready_callbacks")
+
+    def _build_search_index(self):
         try:
-            with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return []
+            with self.lock:
+                # Copies, the records keep changing while the index is built
+                snapshot = [dict(task) for task in reversed(self.history)]
+            search_index = SqliteHistoryStorage(":memory:", legacy_path=None)
+            search_index.save(None, snapshot)
+            with self.lock:
+                search_index.save(None, self._unindexed.values())
+                self._unindexed.clear()
+                self.search_index = search_index
+        except Exception as e:
+            print(f"Building the history search index failed: {e}")
+            self._search_error = e
+        self._set_event(self._searchable, "_searchable_callbacks")
+
+    def _set_event(self, event, callbacks_name):
+        event.set()
+        with self._load_lock:
+            callbacks = getattr(self, callbacks_name)
+            setattr(self, callbacks_name, [])
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"History callback failed: {e}")
+
+    def _ensure_loaded(self):
+        if not self._loaded.is_set():
+            with self._load_lock:
+                load_here = self._load_thread is None and not self._loaded.is_set()
+                if load_here:
+                    # Marks the load as taken, other callers wait for this thread
+                    self._load_thread = threading.current_thread()
+            if load_here:
+                self._load()
+            self._loaded.wait()
+        if self._load_error is not None:
+            raise RuntimeError("History could not be loaded") from self._load_error
+
+    def _ensure_searchable(self):
+        if not self._searchable.is_set():
+            self._ensure_loaded()
+            self._searchable.wait()
+        if self._search_error is not None:
+            raise RuntimeError("History search is unavailable") from self._search_error
+
+    def is_loaded(self):
+        return self._loaded.is_set()
+
+    def can_search(self):
+        """True when search() and distinct() answer without waiting for the history or its index."""
+        return self._searchable.is_set()
+
+    def on_ready(self, callback):
+        """Call callback() once the history is in memory, right away if it already is.
 
-    def save_history(self):
-        with open(HISTORY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.history, f, indent=4, ensure_ascii=False)
+        Callbacks run on the loading thread.
+        """
+        self._on_event(self._loaded, "_ready_callbacks", callback)
+
+    def on_searchable(self, callback):
+        """Call callback() once search() no longer waits, right away if it already does not.
+
+        Callbacks run on the loading or indexing thread.
+        """
+        self._on_event(self._searchable, "_searchable_callbacks", callback)
+
+    def _on_event(self, event, callbacks_name, callback):
+        with self._load_lock:
+            if not event.is_set():
+                getattr(self, callbacks_name).append(callback)
+                return
+        callback()
+
+    def save_history(self, task):
+        """Queue task, which was just added or changed, for the background writer."""
+        with self.lock:
+            self._dirty[task["id"]] = task
+            if self.search_index is None:
+                # Picked up by _build_search_index() once the copy is ready
+                self._unindexed[task["id"]] = task
+            elif self.search_index is not self.storage:
+                self.search_index.save(None, [task])
+        self._wake.set()
+
+    def _writer_loop(self):
+        while not self._closed:
+            self._wake.wait()
+            if self._closed:
+                break
+            # Let the rest of the burst arrive before writing
+            time.sleep(cfg.get("history_write_delay"))
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write every pending change now."""
+        with self._write_lock:
+            with self.lock:
+                if not self._dirty:
+                    return
+                # Copies, so the records can keep changing while they are written
+                dirty = [dict(task) for task in self._dirty.values()]
+                self._dirty.clear()
+                history = [dict(task) for task in self.history] if self.storage.full_rewrite else None
+            try:
+                self.storage.save(history, dirty)
+            except Exception as e:
+                print(f"Saving history failed: {e}")
+                with self.lock:
+                    for task in dirty:
+                        self._dirty.setdefault(task["id"], self.index[task["id"]])
+
+    def close(self):
+        """Stop the writer, flush pending changes and close the storage."""
+        if self._closed:
+            return
+        load_thread = self._load_thread
+        if load_thread is not None and load_thread is not threading.current_thread():
+            load_thread.join()
+        self._closed = True
+        self._wake.set()
+        self._writer.join(timeout=5)
+        self.flush()
+        self.storage.close()
 
     def add_task(self, task_id, prompt, model, aspect_ratio, image_size, ref_images=None):
         task = {
@@ -35,8 +225,11 @@ class HistoryManager:
             "result_path": None,
             "preview_url": None
         }
-        self.history.insert(0, task) # Add to top
-        self.save_history()
+        self._ensure_loaded()
+        with self.lock:
+            self.history.insert(0, task) # Add to top
+            self.index[task_id] = task
+            self.save_history(task)
         return task
 
     def add_gpt_task(self, task_id, prompt, model, size, variants, ref_images=None):
@@ -53,39 +246,62 @@ class HistoryManager:
             "result_path": None,
             "preview_url": None
         }
-        self.history.insert(0, task) # Add to top
-        self.save_history()
+        self._ensure_loaded()
+        with self.lock:
+            self.history.insert(0, task) # Add to top
+            self.index[task_id] = task
+            self.save_history(task)
         return task
 
-    def update_task(self, task_id, status, result_path=None, preview_url=None, failure_reason=None):
-        for task in self.history:
-            if task["id"] == task_id:
-                task["status"] = status
-                if result_path:
-                    task["result_path"] = result_path
-                if preview_url:
-                    task["preview_url"] = preview_url
-                if failure_reason:
-                    task["failure_reason"] = failure_reason
-                self.save_history()
-                return task
-        return None
-
-    def update_gpt_task(self, task_id, status, result_path=None, preview_url=None, failure_reason=None):
-        for task in self.history:
-            if task["id"] == task_id:
-                task["status"] = status
-                if result_path:
-                    task["result_path"] = result_path
-                if preview_url:
-                    task["preview_url"] = preview_url
-                if failure_reason:
-                    task["failure_reason"] = failure_reason
-                self.save_history()
-                return task
-        return None
+    def update(self, task_id, **fields):
+        """Change the given fields of a task of either api type.
+
+        Fields passed as None are left as they are. The task is only written
+        back when something actually changed. Returns the task, or None if
+        the id is unknown.
+        """
+        self._ensure_loaded()
+        with self.lock:
+            task = self.index.get(task_id)
+            if task is None:
+                return None
+            changed = False
+            for key, value in fields.items():
+                if value is not None and task.get(key) != value:
+                    task[key] = value
+                    changed = True
+            if changed:
+                self.save_history(task)
+            return task
+
+    def update_task(self, task_id, status, result_path=None, preview_url=None, failure_reason=None, result_paths=None):
+        return self.update(task_id, status=status, result_path=result_path or None, result_paths=result_paths or None,
+                           preview_url=preview_url or None, failure_reason=failure_reason or None)
+
+    def update_gpt_task(self, task_id, status, result_path=None, preview_url=None, failure_reason=None, result_paths=None):
+        return self.update_task(task_id, status, result_path, preview_url, failure_reason, result_paths)
+
+    def search(self, text="", offset=0, limit=50, **filters):
+        """Return (tasks, total) for one page of matching tasks, newest first.
+
+        See SqliteHistoryStorage.search for text, filters and date_from/date_to.
+        """
+        self._ensure_searchable()
+        if self.search_index is self.storage:
+            # Pending changes are not in the database yet
+            self.flush()
+        return self.search_index.search(text, offset, limit, **filters)
+
+    def distinct(self, column):
+        self._ensure_searchable()
+        if self.search_index is self.storage:
+            self.flush()
+        return self.search_index.distinct(column)
 
     def get_all_tasks(self):
-        return self.history
+        self._ensure_loaded()
+        # A snapshot, other threads keep adding tasks while the caller iterates
+        with self.lock:
+            return list(self.history)
 
 history_mgr = HistoryManager()
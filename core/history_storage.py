@@ -0,0 +1,430 @@
+import json
+import os
+import sqlite3
+import threading
+
+from core.config import cfg
+
+HISTORY_FILE = 'grsai_history.json'
+HISTORY_DB = 'grsai_history.db'
+HISTORY_SNAPSHOT = 'grsai_history.snapshot.jsonl'
+HISTORY_JOURNAL = 'grsai_history.journal.jsonl'
+
+class JsonHistoryStorage:
+    """Legacy storage: the whole history as one JSON list, newest first."""
+    # save() needs the whole history, not only the changed records
+    full_rewrite = True
+
+    def __init__(self, path=HISTORY_FILE):
+        self.path = path
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except:
+            return []
+
+    def save(self, history, dirty):
+        # Write a temp file and swap it in, a crash never leaves a truncated history
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(history, f, indent=4, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def close(self):
+        pass
+
+# Columns search() can filter on with an exact match
+FILTER_COLUMNS = ("model", "api_type", "status", "ratio", "image_size")
+
+def _like_pattern(term):
+    return "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+class SqliteHistoryStorage:
+    """One row per task in a WAL-mode SQLite database.
+
+    The full record is kept as JSON in the data column; the columns used for
+    ordering and filtering are copied out and indexed, and prompts go into an
+    FTS5 trigram index for search(). save() only writes the records that
+    changed. The first load() imports an existing grsai_history.json and
+    renames it to grsai_history.json.bak, so the import runs wherever the
+    history is loaded (in the GUI, on the background loader).
+
+    With path ":memory:" and no legacy_path it serves as the search index for
+    the flat-file backends.
+    """
+    full_rewrite = False
+    searchable = True
+
+    def __init__(self, path=HISTORY_DB, legacy_path=HISTORY_FILE):
+        self.path = path
+        self.legacy_path = legacy_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # Searches read rows all over the file; mapping it saves a read() per page
+        self._conn.execute("PRAGMA mmap_size=268435456")
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    id TEXT NOT NULL UNIQUE,
+                    created_at TEXT,
+                    status TEXT,
+                    model TEXT,
+                    api_type TEXT,
+                    prompt TEXT,
+                    data TEXT NOT NULL
+                )""")
+            self._add_filter_columns()
+            for column in ("created_at", "status", "model", "api_type", "ratio", "image_size"):
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_tasks_{column} ON tasks({column})")
+            self.fts = self._create_fts()
+
+    def _add_filter_columns(self):
+        # Databases created before search was added lack these columns
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tasks)")}
+        if "ratio" not in columns:
+            self._conn.execute("ALTER TABLE tasks ADD COLUMN ratio TEXT")
+            self._conn.execute("ALTER TABLE tasks ADD COLUMN image_size TEXT")
+            self._conn.execute("""
+                UPDATE tasks SET
+                    ratio = coalesce(json_extract(data, '$.aspect_ratio'), json_extract(data, '$.size')),
+                    image_size = json_extract(data, '$.image_size')""")
+
+    def _create_fts(self):
+        exists = self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'tasks_fts'").fetchone()
+        if exists:
+            return True
+        try:
+            self._conn.execute("""
+                CREATE VIRTUAL TABLE tasks_fts USING fts5(
+                    prompt, content='tasks', content_rowid='seq', tokenize='trigram')""")
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5 or older than 3.34, search falls back to LIKE
+            return False
+        self._conn.executescript("""
+            CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks BEGIN
+                INSERT INTO tasks_fts (rowid, prompt) VALUES (new.seq, new.prompt);
+            END;
+            CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks BEGIN
+                INSERT INTO tasks_fts (tasks_fts, rowid, prompt) VALUES ('delete', old.seq, old.prompt);
+            END;
+            CREATE TRIGGER tasks_fts_update AFTER UPDATE OF prompt ON tasks
+            WHEN old.prompt IS NOT new.prompt BEGIN
+                INSERT INTO tasks_fts (tasks_fts, rowid, prompt) VALUES ('delete', old.seq, old.prompt);
+                INSERT INTO tasks_fts (rowid, prompt) VALUES (new.seq, new.prompt);
+            END;
+            INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild');""")
+        return True
+
+    def pending_import(self):
+        """True while load() still has to import the legacy JSON history."""
+        if not self.legacy_path or not os.path.exists(self.legacy_path):
+            return False
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM tasks LIMIT 1").fetchone() is None
+
+    def _migrate_legacy(self):
+        if not self.pending_import():
+            return
+        legacy = JsonHistoryStorage(self.legacy_path).load()
+        # Oldest first so seq keeps the original order
+        self._upsert(reversed(legacy))
+        os.replace(self.legacy_path, self.legacy_path + ".bak")
+
+    def _upsert(self, tasks):
+        rows = [(task["id"], task.get("created_at"), task.get("status"), task.get("model"), task.get("api_type"),
+                 task.get("prompt"), task.get("aspect_ratio") or task.get("size"), task.get("image_size"),
+                 json.dumps(task, ensure_ascii=False)) for task in tasks if task.get("id")]
+        with self._lock, self._conn:
+            self._conn.executemany("""
+                INSERT INTO tasks (id, created_at, status, model, api_type, prompt, ratio, image_size, data)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    created_at = excluded.created_at, status = excluded.status, model = excluded.model,
+                    api_type = excluded.api_type, prompt = excluded.prompt, ratio = excluded.ratio,
+                    image_size = excluded.image_size, data = excluded.data""", rows)
+
+    def load(self):
+        self._migrate_legacy()
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM tasks ORDER BY seq DESC").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def save(self, history, dirty):
+        # history is None, only the changed records are passed in
+        self._upsert(dirty)
+
+    def search(self, text="", offset=0, limit=50, date_from=None, date_to=None, **filters):
+        """Return (tasks, total) for one page of matches, newest first.
+
+        Every word of text must appear in the prompt (case-insensitive
+        substring). filters are exact matches on FILTER_COLUMNS, a None or
+        empty value is ignored. date_from and date_to compare against
+        created_at ("YYYY-MM-DD HH:MM:SS"), both inclusive.
+        """
+        conditions = []  # (sql, params), all must hold
+        for column, value in filters.items():
+            if column not in FILTER_COLUMNS:
+                raise ValueError(f"Cannot filter on {column}")
+            if value:
+                conditions.append((f"{column} = ?", [value]))
+
+        terms = text.split()
+        # The trigram tokenizer can only match terms of three or more characters
+        fts_terms = [term for term in terms if self.fts and len(term) >= 3]
+        like_terms = [term for term in terms if term not in fts_terms
+                      # A shorter term found inside a longer one is already matched by it
+                      and not any(term.lower() in longer.lower() for longer in fts_terms)]
+
+        with self._lock:
+            # FTS hits are read by rowid, so a date range is best turned into a seq range
+            seqs = None
+            if date_from or date_to:
+                seqs = self._date_seqs(date_from, date_to)
+                if seqs is None:
+                    dates = [("created_at >= ?", date_from), ("created_at <= ?", date_to)]
+                    conditions.append((" AND ".join(sql for sql, value in dates if value),
+                                       [value for sql, value in dates if value]))
+                elif seqs[0] > seqs[1]:
+                    return [], 0
+
+            use_fts = False
+            if fts_terms:
+                fts_where = "tasks_fts MATCH ?" + (" AND rowid BETWEEN ? AND ?" if seqs else "")
+                match = " AND ".join('"' + term.replace('"', '""') + '"' for term in fts_terms)
+                fts_params = [match, *seqs] if seqs else [match]
+                hits = self._conn.execute(f"SELECT COUNT(*) FROM tasks_fts WHERE {fts_where}", fts_params).fetchone()[0]
+                if not hits:
+                    return [], 0
+                if not conditions and not like_terms:
+                    # Only the FTS index is needed: page straight from it, it walks rowids newest first
+                    rows = self._conn.execute(f"""
+                        SELECT data FROM tasks JOIN (
+                            SELECT rowid FROM tasks_fts WHERE {fts_where} ORDER BY rowid DESC LIMIT ? OFFSET ?
+                        ) AS hits ON tasks.seq = hits.rowid ORDER BY seq DESC""", fts_params + [limit, offset]).fetchall()
+                    return [json.loads(row[0]) for row in rows], hits
+                # Each FTS hit costs a row lookup, each row of the most selective filter a
+                # substring check on its prompt; start from the smaller set
+                use_fts = hits <= self._candidates(conditions, seqs)
+                if use_fts:
+                    conditions.append((f"seq IN (SELECT rowid FROM tasks_fts WHERE {fts_where})", fts_params))
+                else:
+                    like_terms.extend(fts_terms)
+            if seqs:
+                conditions.append(("seq BETWEEN ? AND ?", list(seqs)))
+            for term in like_terms:
+                conditions.append(("prompt LIKE ? ESCAPE '\\'", [_like_pattern(term)]))
+
+            clause = " WHERE " + " AND ".join(sql for sql, _ in conditions) if conditions else ""
+            params = [value for _, values in conditions for value in values]
+            if use_fts:
+                # There are at most hits matches: list them once instead of walking
+                # the FTS hits again for the page
+                matches = [row[0] for row in self._conn.execute(f"SELECT seq FROM tasks{clause} ORDER BY seq DESC", params)]
+                total = len(matches)
+                page = matches[offset:offset + limit]
+                rows = self._conn.execute(f"SELECT data FROM tasks WHERE seq IN ({', '.join('?' * len(page))}) "
+                                          "ORDER BY seq DESC", page).fetchall()
+            else:
+                total = self._conn.execute(f"SELECT COUNT(*) FROM tasks{clause}", params).fetchone()[0]
+                # Pick the page by seq first, so a sort (e.g. over a date range) never carries the data column
+                rows = self._conn.execute(f"""
+                    SELECT data FROM tasks WHERE seq IN (
+                        SELECT seq FROM tasks{clause} ORDER BY seq DESC LIMIT ? OFFSET ?
+                    ) ORDER BY seq DESC""", params + [limit, offset]).fetchall()
+        return [json.loads(row[0]) for row in rows], total
+
+    def _candidates(self, conditions, seqs):
+        """Rows a LIKE check would read: those of the most selective condition, each
+        counted on its own index. Rows read in seq order, from a seq range or the
+        whole table, count half. Called with the lock held."""
+        if seqs:
+            counts = [(seqs[1] - seqs[0] + 1) // 2]
+        else:
+            counts = [(self._conn.execute("SELECT MAX(seq) FROM tasks").fetchone()[0] or 0) // 2]
+        for sql, params in conditions:
+            counts.append(self._conn.execute(f"SELECT COUNT(*) FROM tasks WHERE {sql}", params).fetchone()[0])
+        return min(counts)
+
+    def _date_seqs(self, date_from, date_to):
+        """The (first, last) seq of the tasks created in a date range, if exactly the
+        tasks in that seq range were, otherwise None. Tasks are added in the order
+        they are created, so this holds unless an import mixed up the order.
+        Called with the lock held."""
+        where = []
+        params = []
+        if date_from:
+            where.append("created_at >= ?")
+            params.append(date_from)
+        if date_to:
+            where.append("created_at <= ?")
+            params.append(date_to)
+        first, last, count = self._conn.execute(
+            f"SELECT MIN(seq), MAX(seq), COUNT(*) FROM tasks WHERE {' AND '.join(where)}", params).fetchone()
+        if not count:
+            return 1, 0
+        if last - first + 1 != count:
+            # Deleted tasks leave gaps in seq; only tasks out of order matter
+            in_range = self._conn.execute("SELECT COUNT(*) FROM tasks WHERE seq BETWEEN ? AND ?", (first, last)).fetchone()[0]
+            if in_range != count:
+                return None
+        return first, last
+
+    def distinct(self, column):
+        """Values present in a filter column, for populating filter choices."""
+        if column not in FILTER_COLUMNS:
+            raise ValueError(f"Cannot filter on {column}")
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT DISTINCT {column} FROM tasks WHERE {column} IS NOT NULL ORDER BY {column}").fetchall()
+        return [row[0] for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def _read_jsonl(path, records):
+    """Stream one record per line from path into the records dict, later lines win."""
+    if not os.path.exists(path):
+        return 0
+    count = 0
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                task = json.loads(line)
+            except ValueError:
+                # A crash in the middle of an append leaves a partial last line
+                continue
+            records[task["id"]] = task
+            count += 1
+    return count
+
+class JournalHistoryStorage:
+    """Flat-file storage: a snapshot plus an append-only journal, both JSON lines.
+
+    save() appends the changed records to the journal. Once the journal has
+    history_compact_lines entries it is renamed to .old and a background
+    thread folds it into a fresh snapshot. load() streams the snapshot, a
+    leftover .old journal and the journal, the last line for an id wins.
+    Records are kept oldest first on disk.
+    """
+    full_rewrite = False
+
+    def __init__(self, snapshot_path=HISTORY_SNAPSHOT, journal_path=HISTORY_JOURNAL, legacy_path=HISTORY_FILE):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.old_journal_path = journal_path + ".old"
+        self.legacy_path = legacy_path
+        self._lock = threading.Lock()
+        self._compactor = None
+        self._journal_lines = 0
+        self._journal = None
+
+    def load(self):
+        records = {}
+        if not os.path.exists(self.snapshot_path) and not os.path.exists(self.journal_path) \
+                and os.path.exists(self.legacy_path):
+            self._migrate_legacy()
+        _read_jsonl(self.snapshot_path, records)
+        _read_jsonl(self.old_journal_path, records)
+        self._journal_lines = _read_jsonl(self.journal_path, records)
+        with self._lock:
+            if os.path.exists(self.old_journal_path) and self._compactor is None:
+                # The last compaction did not finish
+                self._start_compaction()
+        return list(reversed(records.values()))
+
+    def _migrate_legacy(self):
+        legacy = JsonHistoryStorage(self.legacy_path).load()
+        self._write_snapshot(reversed(legacy))
+        os.replace(self.legacy_path, self.legacy_path + ".bak")
+
+    def _write_snapshot(self, tasks):
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for task in tasks:
+                f.write(json.dumps(task, ensure_ascii=False, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+    def save(self, history, dirty):
+        with self._lock:
+            if self._journal is None:
+                self._journal = self._open_journal()
+            for task in dirty:
+                self._journal.write(json.dumps(task, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._journal_lines += len(dirty)
+            if self._journal_lines >= cfg.get("history_compact_lines") and self._compactor is None:
+                self._start_compaction()
+
+    def _open_journal(self):
+        # A crash in the middle of an append leaves a partial last line. Cut it off,
+        # or the next record would be glued onto it and skipped by _read_jsonl.
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'rb+') as f:
+                end = f.seek(0, os.SEEK_END)
+                pos = end
+                while pos > 0:
+                    start = max(0, pos - 4096)
+                    f.seek(start)
+                    newline = f.read(pos - start).rfind(b"\n")
+                    if newline != -1:
+                        pos = start + newline + 1
+                        break
+                    pos = start
+                if pos != end:
+                    f.truncate(pos)
+        return open(self.journal_path, 'a', encoding='utf-8')
+
+    def _start_compaction(self):
+        # Called with the lock held; appends go to a new journal from here on
+        if not os.path.exists(self.old_journal_path):
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            os.replace(self.journal_path, self.old_journal_path)
+            self._journal_lines = 0
+        self._compactor = threading.Thread(target=self._compact, name="grsai-history-compactor", daemon=True)
+        self._compactor.start()
+
+    def _compact(self):
+        try:
+            records = {}
+            _read_jsonl(self.snapshot_path, records)
+            _read_jsonl(self.old_journal_path, records)
+            self._write_snapshot(records.values())
+            os.remove(self.old_journal_path)
+        except Exception as e:
+            print(f"History compaction failed: {e}")
+        finally:
+            with self._lock:
+                self._compactor = None
+
+    def close(self):
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+def create_storage(backend):
+    if backend == "json":
+        return JsonHistoryStorage()
+    if backend == "sqlite":
+        return SqliteHistoryStorage()
+    if backend == "journal":
+        return JournalHistoryStorage()
+    raise ValueError(f"Unknown history backend {backend}")
@@ -0,0 +1,72 @@
+import struct
+import zlib
+
+from core.asset_store import sniff_mime
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Samples per pixel for each PNG color type
+PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+def preview_bytes(data):
+    """Turn the first bytes of an image download into a complete image file.
+
+    JPEG decoders already render a truncated file, so JPEG data is returned
+    as is. A PNG is rebuilt from every scanline received so far, padded with
+    blank rows to its full height. Returns None when nothing can be shown yet,
+    or for formats that cannot be previewed this way (interlaced PNG, WebP).
+    """
+    mime = sniff_mime(data)
+    if mime == "jpeg":
+        return data
+    if mime == "png":
+        return _truncated_png(data)
+    return None
+
+def _png_chunk(kind, payload):
+    return struct.pack(">I", len(payload)) + kind + payload + struct.pack(">I", zlib.crc32(kind + payload))
+
+def _truncated_png(data):
+    header = None
+    ancillary = []  # Complete chunks before the image data, e.g. PLTE and tRNS
+    compressed = []
+    pos = len(PNG_SIGNATURE)
+    while pos + 8 <= len(data):
+        length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        payload = data[pos + 8:pos + 8 + length]
+        complete = len(payload) == length and pos + 12 + length <= len(data)
+        if kind == b"IHDR":
+            if not complete:
+                return None
+            header = payload
+        elif kind == b"IDAT":
+            compressed.append(payload)  # The last one may be cut short
+        elif kind == b"IEND":
+            break
+        elif not compressed and complete:
+            ancillary.append(_png_chunk(kind, payload))
+        pos += 12 + length
+    if header is None or not compressed:
+        return None
+
+    width, height, bit_depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", header)
+    if interlace or color_type not in PNG_CHANNELS:
+        return None
+    # Every scanline starts with its filter type byte
+    row_bytes = 1 + (width * PNG_CHANNELS[color_type] * bit_depth + 7) // 8
+    try:
+        raw = zlib.decompressobj().decompress(b"".join(compressed))
+    except zlib.error:
+        return None
+    rows = min(len(raw) // row_bytes, height)
+    if rows == 0:
+        return None
+
+    # Unfiltered all-zero rows stand in for the part that has not arrived
+    encoder = zlib.compressobj(1)
+    parts = [encoder.compress(raw[:rows * row_bytes])]
+    blank = bytes(row_bytes)
+    for _ in range(height - rows):
+        parts.append(encoder.compress(blank))
+    parts.append(encoder.flush())
+    return b"".join([PNG_SIGNATURE, _png_chunk(b"IHDR", header), *ancillary,
+                     _png_chunk(b"IDAT", b"".join(parts)), _png_chunk(b"IEND", b"")])
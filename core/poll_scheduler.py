@@ -0,0 +1,207 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from collections import OrderedDict
+
+from core.config import cfg
+
+MAX_NETWORK_ERRORS = 5
+MAX_EARLY_PUSHES = 256
+
+# Rough relative generation time, used to stretch the poll interval for slow jobs
+MODEL_COST = {
+    "nano-banana-fast": 0.4,
+    "nano-banana": 0.6,
+    "nano-banana-pro": 1.0,
+    "nano-banana-pro-vt": 1.0,
+    "sora-image": 1.0
+}
+SIZE_COST = {"1K": 1.0, "2K": 1.25, "4K": 1.5}
+
+class PollError(Exception):
+    pass
+
+def _job_cost(job):
+    cost = MODEL_COST.get(job.get("model"), 1.0)
+    cost *= SIZE_COST.get(job.get("image_size"), 1.0)
+    try:
+        variants = int(job.get("variants") or 1)
+    except ValueError:
+        variants = 1
+    return cost * (1 + 0.2 * (variants - 1))
+
+class PollScheduler:
+    """Owns every in-flight task id and decides when each one is polled next.
+
+    A single coroutine sleeps until the earliest due task, so the number of
+    timers does not grow with the number of tasks. Intervals adapt per task:
+    - slow models, large sizes and low progress poll less often
+    - progress that stops moving backs off further
+    - progress close to 100 polls at poll_min_interval
+    - code -22 (task not visible yet) and network errors use jittered
+      exponential backoff
+
+    Tasks watched with push=True get their updates from webhook callbacks
+    through push(); they are only polled if no callback arrives within
+    webhook_timeout seconds, after which they fall back to normal polling.
+    """
+
+    def __init__(self, call):
+        # call(func, *args) runs a blocking function off the loop and awaits it
+        self._call = call
+        self._tasks = {}
+        self._heap = []
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._runner = None
+        self._in_flight = set()
+        # Callbacks can beat the submit response back to us
+        self._early_pushes = OrderedDict()
+
+    def watch(self, task_id, api, job, on_update=None, push=False):
+        """Start polling task_id, returns a Future resolved with the final result
+        data (status succeeded or failed). Raises PollError when polling gives up."""
+        entry = {
+            "id": task_id,
+            "api": api,
+            "job": job,
+            "on_update": on_update,
+            "future": asyncio.get_running_loop().create_future(),
+            "due": None,
+            "progress": 0,
+            "flat_polls": 0,
+            "errors": 0,
+            "not_found": 0,
+            "push": push
+        }
+        self._tasks[task_id] = entry
+        self._schedule(entry, cfg.get("webhook_timeout") if push else cfg.get("poll_min_interval"))
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.ensure_future(self._run())
+        if task_id in self._early_pushes:
+            self.handle_data(task_id, self._early_pushes.pop(task_id), pushed=True)
+        return entry["future"]
+
+    def push(self, task_id, data):
+        """Apply a webhook callback payload. Must be called on the loop thread."""
+        if task_id in self._tasks:
+            self.handle_data(task_id, data, pushed=True)
+            return
+        self._early_pushes[task_id] = data
+        while len(self._early_pushes) > MAX_EARLY_PUSHES:
+            self._early_pushes.popitem(last=False)
+
+    def _schedule(self, entry, delay):
+        entry["due"] = time.monotonic() + delay
+        heapq.heappush(self._heap, (entry["due"], next(self._counter), entry["id"]))
+        self._wakeup.set()
+
+    async def _run(self):
+        while self._tasks:
+            now = time.monotonic()
+            while self._heap and self._heap[0][0] <= now:
+                due, _, task_id = heapq.heappop(self._heap)
+                entry = self._tasks.get(task_id)
+                # Skip entries that were rescheduled or finished since they were pushed
+                if entry is None or entry["due"] != due:
+                    continue
+                entry["due"] = None
+                poll = asyncio.ensure_future(self._poll(entry))
+                self._in_flight.add(poll)
+                poll.add_done_callback(self._in_flight.discard)
+
+            timeout = self._heap[0][0] - now if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll(self, entry):
+        try:
+            res = await self._call(entry["api"].get_task_result, entry["id"])
+        except Exception as e:
+            res = {"code": -1, "msg": str(e)}
+
+        if entry["id"] not in self._tasks:
+            return
+
+        code = res.get("code")
+        if code == -1: # Network error reported by the client
+            entry["errors"] += 1
+            if entry["errors"] > MAX_NETWORK_ERRORS:
+                self._finish(entry, error=f"Network error: {res.get('msg')}")
+                return
+            self._schedule(entry, self._backoff(entry["errors"]))
+            return
+        entry["errors"] = 0
+
+        if code == -22: # Task not found, maybe not ready yet?
+            entry["not_found"] += 1
+            self._schedule(entry, self._backoff(entry["not_found"]))
+            return
+
+        if code != 0:
+            self._finish(entry, error=res.get("msg", "Unknown error"))
+            return
+
+        entry["not_found"] = 0
+        self.handle_data(entry["id"], res.get("data", {}))
+
+    def handle_data(self, task_id, data, pushed=False):
+        """Apply a task status payload to a watched task."""
+        entry = self._tasks.get(task_id)
+        if entry is None:
+            return
+        if not pushed:
+            # A poll happened, so the callback deadline passed: keep polling from now on
+            entry["push"] = False
+        status = data.get("status")
+        progress = data.get("progress") or 0
+
+        if entry["on_update"]:
+            entry["on_update"](progress, status)
+
+        if status in ("succeeded", "failed"):
+            self._finish(entry, data=data)
+            return
+
+        if progress > entry["progress"]:
+            entry["flat_polls"] = 0
+        else:
+            entry["flat_polls"] += 1
+        entry["progress"] = progress
+
+        # Polls already scheduled are replaced, not duplicated
+        if entry["push"]:
+            self._schedule(entry, cfg.get("webhook_timeout"))
+        else:
+            self._schedule(entry, self._next_interval(entry))
+
+    def _finish(self, entry, data=None, error=None):
+        self._tasks.pop(entry["id"], None)
+        entry["due"] = None
+        if entry["future"].done():
+            return
+        if error is not None:
+            entry["future"].set_exception(PollError(error))
+        else:
+            entry["future"].set_result(data)
+        self._wakeup.set()
+
+    def _next_interval(self, entry):
+        min_interval = cfg.get("poll_min_interval")
+        max_interval = cfg.get("poll_max_interval")
+
+        remaining = (100 - min(entry["progress"], 100)) / 100
+        interval = min_interval + (max_interval - min_interval) * remaining * _job_cost(entry["job"])
+        # Progress not moving: the server is queued or busy, ask less often
+        interval *= 1.5 ** min(entry["flat_polls"], 4)
+        return min(max(interval, min_interval), max_interval)
+
+    def _backoff(self, attempt):
+        delay = min(cfg.get("poll_backoff_max"), cfg.get("poll_min_interval") * 2 ** attempt)
+        # Equal jitter keeps many tasks from retrying in lockstep
+        return random.uniform(delay / 2, delay)
@@ -0,0 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed, CancelledError
+
+from core.config import cfg
+from core.asset_store import asset_store
+
+class ReferenceImageError(Exception):
+    pass
+
+def prepare_reference(ref):
+    """Validate one reference image, keep it in the asset store and return (hash, data_uri).
+
+    ref is a file path, or the encoded bytes of an image that only exists in
+    memory, such as a paste. Repeated submissions of the same image reuse the
+    stored hash and the cached data URI instead of reading and encoding it again.
+    """
+    name = "pasted image" if isinstance(ref, bytes) else ref
+    try:
+        if isinstance(ref, bytes):
+            asset_hash, data = asset_store.put_bytes(ref), ref
+        else:
+            asset_hash, data = asset_store.put_file(ref)
+        return asset_hash, asset_store.data_uri(asset_hash, data)
+    except OSError as e:
+        raise ReferenceImageError(f"Cannot read {name}: {e}") from e
+    except ValueError as e:
+        raise ReferenceImageError(f"{name}: {e}") from e
+
+def prepare_references(paths, on_progress=None, is_cancelled=None):
+    """Prepare reference images (paths or bytes) in parallel, keeping the input order.
+
+    Returns (data_uris, hashes, errors). Images that fail are skipped and their
+    error message is added to errors; the same image given twice is only sent
+    once. on_progress(done, total) is called after each image; when
+    is_cancelled() turns true the remaining work is dropped and CancelledError
+    is raised.
+    """
+    total = len(paths)
+    results = [None] * total
+    errors = []
+    if not paths:
+        return [], [], errors
+
+    with ThreadPoolExecutor(max_workers=min(cfg.get("reference_workers"), total), thread_name_prefix="grsai-ref") as pool:
+        futures = {pool.submit(prepare_reference, path): i for i, path in enumerate(paths)}
+        for done, future in enumerate(as_completed(futures), 1):
+            if is_cancelled and is_cancelled():
+                for pending in futures:
+                    pending.cancel()
+                raise CancelledError()
+            try:
+                results[futures[future]] = future.result()
+            except ReferenceImageError as e:
+                errors.append(str(e))
+            if on_progress:
+                on_progress(done, total)
+
+    uris = []
+    hashes = []
+    for result in results:
+        if result is None or result[0] in hashes:
+            continue
+        hashes.append(result[0])
+        uris.append(result[1])
+    return uris, hashes, errors
@@ -0,0 +1,62 @@
+import os
+import time
+from contextlib import contextmanager
+
+class StartupTimer:
+    """Times the phases of application startup up to the first painted frame.
+
+    Times are measured from the first import of this module, which main.py
+    does before anything else. Phases are recorded in the order they end and
+    may nest, e.g. history loading while the first page is built. finish()
+    is called on the first paint and prints the report when the environment
+    variable GRSAI_STARTUP_REPORT is set, or when startup took longer than
+    startup_budget_ms.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = []  # (name, seconds spent, seconds since start when it ended)
+        self.finished = False
+
+    @contextmanager
+    def phase(self, name):
+        if self.finished:
+            # Pages built later on are not part of startup
+            yield
+            return
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.phases.append((name, end - began, end - self.start))
+
+    def mark(self, name):
+        """Record a point in time; its duration is the time since the previous phase ended."""
+        now = time.perf_counter() - self.start
+        previous = self.phases[-1][2] if self.phases else 0.0
+        self.phases.append((name, now - previous, now))
+
+    def elapsed_ms(self):
+        return self.phases[-1][2] * 1000 if self.phases else 0.0
+
+    def report(self):
+        lines = ["Startup timings (ms):"]
+        for name, duration, at in self.phases:
+            lines.append(f"  {name:<28} {duration * 1000:8.1f}  at {at * 1000:8.1f}")
+        return "\n".join(lines)
+
+    def finish(self):
+        """Record the first paint and report on startup. Only the first call counts."""
+        if self.finished:
+            return
+        self.mark("first paint")
+        self.finished = True
+        from core.config import cfg
+        budget = cfg.get("startup_budget_ms")
+        if os.environ.get("GRSAI_STARTUP_REPORT"):
+            print(self.report(), flush=True)
+        elif budget and self.elapsed_ms() > budget:
+            print(f"Startup took {self.elapsed_ms():.0f} ms, over the {budget} ms budget.\n{self.report()}", flush=True)
+
+startup_timer = StartupTimer()
@@ -0,0 +1,350 @@
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from core.config import cfg
+from core.api_client import nano_banana_api, gpt_image_api
+from core.downloader import download_file, remove_stale_parts
+from core.history_manager import history_mgr
+from core.poll_scheduler import PollScheduler, PollError
+from core.thumbnail_cache import thumbnail_cache
+from core.webhook_server import WebhookServer
+
+def nano_banana_job(prompt, model, aspect_ratio="auto", image_size="1K", ref_urls=None, ref_images=None):
+    return {
+        "api_type": "nano_banana",
+        "prompt": prompt,
+        "model": model,
+        "aspect_ratio": aspect_ratio,
+        "image_size": image_size,
+        "ref_urls": ref_urls,
+        "ref_images": ref_images
+    }
+
+def gpt_image_job(prompt, model="sora-image", size="1:1", variants=1, ref_urls=None, ref_images=None):
+    return {
+        "api_type": "gpt_image",
+        "prompt": prompt,
+        "model": model,
+        "size": size,
+        "variants": variants,
+        "ref_urls": ref_urls,
+        "ref_images": ref_images
+    }
+
+class _DownloadProgress:
+    """Sums the progress of every image of a task into one on_download_progress stream."""
+
+    def __init__(self, task_id, listener):
+        self.task_id = task_id
+        self.listener = listener
+        self.parts = {}
+        self.last_percent = -1
+        self.last_received = 0
+        self.lock = threading.Lock()
+
+    def part(self, key):
+        def report(received, total):
+            self.update(key, received, total)
+        return report
+
+    def update(self, key, received, total):
+        with self.lock:
+            self.parts[key] = (received, total)
+            received = sum(r for r, _ in self.parts.values())
+            known = all(t for _, t in self.parts.values())
+            total = sum(t for _, t in self.parts.values()) if known else 0
+            # Only report whole-percent steps (or every MB when the size is unknown)
+            if total:
+                percent = received * 100 // total
+                if percent == self.last_percent:
+                    return
+                self.last_percent = percent
+            elif received - self.last_received < 1024 * 1024:
+                return
+            self.last_received = received
+        notify_listener(self.listener, "on_download_progress", self.task_id, received, total)
+
+def _with_partial(part_path, on_progress, on_partial):
+    """Wrap a download progress callback so on_partial(part_path) also runs
+    every preview_partial_interval seconds while the file is incomplete."""
+    interval = cfg.get("preview_partial_interval")
+    last = [time.monotonic()]  # Fast downloads finish before any preview
+
+    def report(received, total):
+        if on_progress:
+            on_progress(received, total)
+        now = time.monotonic()
+        if interval > 0 and received != total and now - last[0] >= interval:
+            last[0] = now
+            on_partial(part_path)
+    return report
+
+def notify_listener(listener, name, *args):
+    if listener is None:
+        return
+    callback = getattr(listener, name, None)
+    if callback is None:
+        return
+    try:
+        callback(*args)
+    except Exception as e:
+        print(f"Task listener {name} failed: {e}")
+
+class TaskEngine:
+    """Drives every generation task on a single asyncio loop in a background thread.
+
+    Polling of every in-flight task is owned by one PollScheduler, and blocking
+    HTTP calls run on a small fixed executor, so the thread count stays the same
+    no matter how many tasks are in flight. With webhook_enabled, tasks are
+    submitted with the URL of an embedded WebhookServer and only polled when
+    no callback arrives in time.
+
+    A listener passed to submit() may implement any of these, all called on the
+    engine thread:
+    - on_submitted(result): raw submit response, code != 0 means it failed
+    - on_update(task_id, progress, status)
+    - on_download_progress(task_id, received, total): total is 0 when unknown
+    - on_partial_image(task_id, index, part_path): an image is still downloading
+      into part_path, which can be read for a preview
+    - on_variant_ready(task_id, index, result_path): one image has been saved
+    - on_finished(task_id, success, result_path, msg)
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._executor = None
+        self._history_executor = None
+        self._scheduler = None
+        self._download_slots = None
+        self._webhook = None
+        self._lock = threading.Lock()
+        self._reserved_paths = set()
+        self._reserved_lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._loop is not None:
+                return
+            self._executor = ThreadPoolExecutor(max_workers=cfg.get("engine_max_workers"), thread_name_prefix="grsai-io")
+            self._loop = asyncio.new_event_loop()
+            self._loop.set_default_executor(self._executor)
+            # History writes are serialized on their own worker
+            self._history_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="grsai-history")
+            self._scheduler = PollScheduler(self._call)
+            # Bounds concurrent image downloads so they cannot starve result polls
+            self._download_slots = asyncio.Semaphore(cfg.get("download_concurrency"))
+            self._thread = threading.Thread(target=self._run_loop, name="grsai-task-engine", daemon=True)
+            self._thread.start()
+            # Interrupted downloads from earlier runs are never resumed
+            self._executor.submit(self._remove_stale_parts)
+            if cfg.get("webhook_enabled"):
+                self._webhook = WebhookServer(self._on_webhook)
+                self._webhook.start()
+
+    def _remove_stale_parts(self):
+        removed = remove_stale_parts(cfg.get("output_folder"), cfg.get("download_part_max_age_hours") * 3600)
+        if removed:
+            print(f"Removed {removed} stale partial downloads")
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def stop(self):
+        with self._lock:
+            if self._loop is None:
+                return
+            if self._webhook is not None:
+                self._webhook.stop()
+                self._webhook = None
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._executor.shutdown(wait=False)
+            self._history_executor.shutdown(wait=True)
+            self._loop = None
+            self._thread = None
+            self._executor = None
+            self._history_executor = None
+            self._scheduler = None
+
+    def _on_webhook(self, data):
+        # Called on a webhook server thread, hand the payload over to the loop
+        loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._scheduler.push, data["id"], data)
+
+    def run(self, coro):
+        """Schedule a coroutine on the engine loop from any thread, returns a concurrent Future."""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def submit(self, job, listener=None):
+        """Submit, poll and download one job. The returned Future resolves to
+        a dict with id, success, result_path, result_paths and msg."""
+        return self.run(self.run_job(job, listener))
+
+    async def _call(self, func, *args, **kwargs):
+        # Blocking work (HTTP, disk, history) goes to the shared executor
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+    async def _call_history(self, func, *args, **kwargs):
+        # A failed history write is logged; the task itself keeps going
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._history_executor, functools.partial(func, *args, **kwargs))
+        except Exception as e:
+            print(f"History update failed: {e}")
+            return None
+
+    async def run_job(self, job, listener=None):
+        result = await self._call(self._submit, job)
+        notify_listener(listener, "on_submitted", result)
+        if result.get("code") != 0:
+            return {"id": None, "success": False, "result_path": "", "result_paths": [], "msg": result.get("msg", "Unknown error")}
+
+        task_id = None
+        try:
+            task_id = result["data"]["id"]
+            await self._call_history(self._record, task_id, job)
+            success, result_paths, msg = await self._poll(task_id, job, listener)
+        except Exception as e:
+            # The task was submitted, the listener must still hear how it ended
+            print(f"Task {task_id} failed: {e}")
+            success, result_paths, msg = False, [], str(e)
+        result_path = result_paths[0] if result_paths else ""
+        notify_listener(listener, "on_finished", task_id, success, result_path, msg)
+        return {"id": task_id, "success": success, "result_path": result_path, "result_paths": result_paths, "msg": msg}
+
+    def _submit(self, job):
+        web_hook = self._webhook.url if self._webhook is not None else "-1"
+        if job["api_type"] == "gpt_image":
+            return gpt_image_api.submit_task(job["prompt"], job["model"], job["size"], job["variants"], job["ref_urls"], web_hook)
+        return nano_banana_api.submit_task(job["prompt"], job["model"], job["aspect_ratio"], job["image_size"], job["ref_urls"], web_hook)
+
+    def _record(self, task_id, job):
+        if job["api_type"] == "gpt_image":
+            history_mgr.add_gpt_task(task_id, job["prompt"], job["model"], job["size"], job["variants"], job["ref_images"])
+        else:
+            history_mgr.add_task(task_id, job["prompt"], job["model"], job["aspect_ratio"], job["image_size"], job["ref_images"])
+
+    async def _poll(self, task_id, job, listener):
+        api = gpt_image_api if job["api_type"] == "gpt_image" else nano_banana_api
+
+        def on_update(progress, status):
+            notify_listener(listener, "on_update", task_id, progress, status)
+
+        try:
+            data = await self._scheduler.watch(task_id, api, job, on_update, push=self._webhook is not None)
+        except PollError as e:
+            return False, [], str(e)
+
+        if data.get("status") == "succeeded":
+            return await self._complete(task_id, job, data, listener)
+
+        reason = data.get("failure_reason", "Unknown")
+        await self._call_history(history_mgr.update, task_id, status="failed", failure_reason=reason)
+        return False, [], reason
+
+    async def _complete(self, task_id, job, data, listener):
+        results = data.get("results", [])
+        if not results:
+            await self._call_history(history_mgr.update, task_id, status="failed", failure_reason="No results found")
+            return False, [], "No results found"
+
+        # Nano Banana returns a single image, GPT Image one per variant
+        if job["api_type"] != "gpt_image":
+            results = results[:1]
+
+        timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+        progress = _DownloadProgress(task_id, listener)
+        landed = {}
+        errors = []
+
+        async def fetch(i, img_url):
+            index = i + 1 if len(results) > 1 else None
+
+            def on_partial(part_path):
+                notify_listener(listener, "on_partial_image", task_id, i, part_path)
+            try:
+                async with self._download_slots:
+                    filepath = await self._call(self._download_result, img_url, timestamp, index, progress.part(i), on_partial)
+            except Exception as e:
+                errors.append(str(e))
+                print(f"Error downloading image {i+1}: {e}")
+                return
+            landed[i] = filepath
+            # Render the history thumbnail now, while the file is hot in the page cache
+            try:
+                await self._call(thumbnail_cache.ensure, filepath)
+            except Exception as e:
+                print(f"Thumbnail for {filepath} failed: {e}")
+            if len(results) > 1:
+                # Each variant shows up in history and the preview as soon as it lands
+                paths = [landed[k] for k in sorted(landed)]
+                await self._call_history(history_mgr.update, task_id, status="running", result_path=paths[0], result_paths=paths)
+            notify_listener(listener, "on_variant_ready", task_id, i, filepath)
+
+        variants = [(i, result.get("url")) for i, result in enumerate(results) if result.get("url")]
+        await asyncio.gather(*(fetch(i, img_url) for i, img_url in variants))
+
+        downloaded_files = [landed[k] for k in sorted(landed)]
+        if not downloaded_files:
+            reason = errors[-1] if errors else "Failed to download any images"
+            await self._call_history(history_mgr.update, task_id, status="failed", failure_reason=reason)
+            return False, [], reason
+
+        # Use first image for preview, but store all paths
+        preview_url = results[0].get("url")
+        if errors:
+            reason = f"{len(errors)} of {len(variants)} images failed to download: {errors[0]}"
+            await self._call_history(history_mgr.update, task_id, status="partial", result_path=downloaded_files[0],
+                             result_paths=downloaded_files, preview_url=preview_url, failure_reason=reason)
+            return True, downloaded_files, reason
+
+        await self._call_history(history_mgr.update, task_id, status="succeeded", result_path=downloaded_files[0],
+                         result_paths=downloaded_files, preview_url=preview_url)
+        return True, downloaded_files, "Success"
+
+    def _reserve_output_path(self, output_dir, stem, ext):
+        # Tasks finishing in the same second would otherwise share a file name
+        with self._reserved_lock:
+            filepath = os.path.join(output_dir, f"{stem}.{ext}")
+            n = 2
+            while filepath in self._reserved_paths or os.path.exists(filepath) or os.path.exists(filepath + ".part"):
+                filepath = os.path.join(output_dir, f"{stem}-{n}.{ext}")
+                n += 1
+            self._reserved_paths.add(filepath)
+            return filepath
+
+    def _download_result(self, img_url, timestamp, index=None, on_progress=None, on_partial=None):
+        ext = "png" # Default
+        if ".jpg" in img_url: ext = "jpg"
+        if ".jpeg" in img_url: ext = "jpeg"
+
+        # Add suffix for multiple images
+        if index:
+            stem = f"grsai_{timestamp}_{index}"
+        else:
+            stem = f"grsai_{timestamp}"
+
+        output_dir = cfg.get("output_folder")
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir, exist_ok=True)
+
+        filepath = self._reserve_output_path(output_dir, stem, ext)
+        if on_partial is not None:
+            on_progress = _with_partial(filepath + ".part", on_progress, on_partial)
+        try:
+            return download_file(img_url, filepath, on_progress)
+        finally:
+            with self._reserved_lock:
+                self._reserved_paths.discard(filepath)
+
+task_engine = TaskEngine()
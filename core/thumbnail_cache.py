@@ -0,0 +1,105 @@
+import hashlib
+import os
+import threading
+
+from core.config import cfg
+
+THUMB_DIR = 'grsai_thumbnails'
+THUMB_SIDE = 176
+
+class ThumbnailCache:
+    """On-disk cache of small pre-scaled copies of output images.
+
+    Entries are named by a hash of the source path, its mtime and size and the
+    thumbnail side, so a changed source simply gets a new entry and the stale
+    one ages out. Entries are evicted least recently used first once they
+    exceed thumbnail_cache_mb.
+
+    core has no image library, so the GUI installs the function that renders a
+    thumbnail with set_generator(). Without one, get() still serves existing
+    entries and ensure() only returns what is already cached.
+    """
+
+    def __init__(self, root=THUMB_DIR):
+        self.root = root
+        self._generator = None
+        self._lock = threading.Lock()
+        self._total = None  # Bytes on disk, None until the first scan
+
+    def set_generator(self, generator):
+        """generator(source_path, dest_path, side) writes a thumbnail whose shorter
+        side is side pixels to dest_path and returns True on success."""
+        self._generator = generator
+
+    def entry_path(self, source, side=THUMB_SIDE):
+        """Cache file for the current version of source, None if source is missing."""
+        try:
+            st = os.stat(source)
+        except OSError:
+            return None
+        key = f"{os.path.abspath(source)}|{st.st_mtime_ns}|{st.st_size}|{side}"
+        return os.path.join(self.root, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".jpg")
+
+    def get(self, source, side=THUMB_SIDE):
+        path = self.entry_path(source, side)
+        if path is None:
+            return None
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            return None
+        return path
+
+    def ensure(self, source, side=THUMB_SIDE):
+        """Return the cached thumbnail of source, rendering it first if needed."""
+        path = self.get(source, side)
+        if path is not None or self._generator is None:
+            return path
+        path = self.entry_path(source, side)
+        if path is None:
+            return None
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            if not self._generator(source, tmp_path, side):
+                return None
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Thumbnail for {source} failed: {e}")
+            return None
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._added(os.path.getsize(path))
+        return path
+
+    def _added(self, size):
+        limit = cfg.get("thumbnail_cache_mb") * 1024 * 1024
+        with self._lock:
+            if self._total is not None:
+                self._total += size
+                if self._total <= limit:
+                    return
+            entries = []
+            total = 0
+            for entry in os.scandir(self.root):
+                if not entry.name.endswith(".jpg"):
+                    continue
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+            if total > limit:
+                # Leave some headroom so the next few thumbnails do not trigger another scan
+                target = limit * 0.9
+                entries.sort()
+                for _, size, path in entries:
+                    if total <= target:
+                        break
+                    try:
+                        os.remove(path)
+                        total -= size
+                    except OSError:
+                        pass
+            self._total = total
+
+thumbnail_cache = ThumbnailCache()
@@ -0,0 +1,103 @@
+import ipaddress
+import json
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.config import cfg
+
+MAX_BODY_SIZE = 1024 * 1024
+
+class _CallbackHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        if self.path != self.server.callback_path:
+            self.send_error(404)
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > MAX_BODY_SIZE:
+            self.send_error(400)
+            return
+
+        try:
+            payload = json.loads(self.rfile.read(length))
+        except ValueError:
+            self.send_error(400)
+            return
+
+        # Callbacks carry the same body as /v1/draw/result, with or without the code/data wrapper
+        data = payload.get("data", payload) if isinstance(payload, dict) else None
+        if not isinstance(data, dict) or not data.get("id"):
+            self.send_error(400)
+            return
+
+        self.server.on_payload(data)
+
+        body = b'{"code": 0}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # Keep the console quiet, one line per callback is noise
+
+def _is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+class WebhookServer:
+    """Small embedded HTTP server that receives Grsai progress/completion callbacks.
+
+    on_payload(data) is called on a server thread with the task payload
+    (id, status, progress, results, failure_reason). The callback path contains
+    a random token so only URLs we handed out are accepted.
+
+    host/port default to webhook_host/webhook_port; port 0 binds a free port.
+    When Grsai cannot reach that address directly (NAT, tunnel, reverse proxy),
+    set webhook_public_url to the externally visible base URL.
+    """
+
+    def __init__(self, on_payload, host=None, port=None, public_url=None):
+        self.on_payload = on_payload
+        self.host = host if host is not None else cfg.get("webhook_host")
+        self.port = port if port is not None else cfg.get("webhook_port")
+        self.public_url = public_url if public_url is not None else cfg.get("webhook_public_url")
+        self.callback_path = f"/grsai/callback/{secrets.token_urlsafe(16)}"
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        if self._server is not None:
+            return
+        self._server = ThreadingHTTPServer((self.host, self.port), _CallbackHandler)
+        self._server.daemon_threads = True
+        self._server.callback_path = self.callback_path
+        self._server.on_payload = self.on_payload
+        self._thread = threading.Thread(target=self._server.serve_forever, name="grsai-webhook", daemon=True)
+        self._thread.start()
+        if not self.public_url and _is_loopback(self.host):
+            print(f"Webhook server listens on {self.host}, which Grsai cannot reach. "
+                  "Set webhook_public_url; until then tasks finish by polling after webhook_timeout.")
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join(timeout=5)
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        if self.public_url:
+            base = self.public_url.rstrip('/')
+        else:
+            base = f"http://{self.host}:{self._server.server_port}"
+        return base + self.callback_path
@@ -1,26 +1,49 @@
 import sys
 import os
-from PySide6.QtWidgets import QApplication
-from PySide6.QtGui import QIcon, QColor
-from PySide6.QtCore import Qt
-from qfluentwidgets import setThemeColor
 
-# Enable High DPI support
-# PySide6 handles High DPI automatically in most cases, but explicit attributes can still be set if needed.
-# QApplication.setAttribute(Qt.AA_EnableHighDpiScaling) # Not needed in PySide6
-# QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps) # Not needed in PySide6
-from ui.main_window import MainWindow
+# Imported first so startup phases are timed from process start
+from core.startup_timer import startup_timer
+
+# Arguments handled by core.cli without loading Qt
+CLI_COMMANDS = ("generate", "batch", "-h", "--help")
+
+def start_history_loading():
+    from core.history_manager import history_mgr
+    history_mgr.start_loading()
+
+def run_gui():
+    with startup_timer.phase("import"):
+        from PySide6.QtWidgets import QApplication
+        from PySide6.QtGui import QIcon, QColor
+        from PySide6.QtCore import Qt, QTimer
+        from qfluentwidgets import setThemeColor
+
+        # Enable High DPI support
+        # PySide6 handles High DPI automatically in most cases, but explicit attributes can still be set if needed.
+        # QApplication.setAttribute(Qt.AA_EnableHighDpiScaling) # Not needed in PySide6
+        # QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps) # Not needed in PySide6
+        # Pages and what they import are loaded when first shown, see LazyPage
+        from ui.main_window import MainWindow
+
+    with startup_timer.phase("window"):
+        app = QApplication(sys.argv)
+
+        # Set custom theme color
+        setThemeColor(QColor('#0078D4'))
+
+        # Set Application Icon
+        if os.path.exists('logo.ico'):
+            app.setWindowIcon(QIcon('logo.ico'))
+
+        w = MainWindow()
+        w.show()
+    # Read the history once the window is up, pages get history_mgr.on_ready()
+    QTimer.singleShot(0, start_history_loading)
+    # The first paint reports on startup, see MainWindow.paintEvent
+    return app.exec()
 
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    
-    # Set custom theme color
-    setThemeColor(QColor('#0078D4'))
-    
-    # Set Application Icon
-    if os.path.exists('logo.ico'):
-        app.setWindowIcon(QIcon('logo.ico'))
-        
-    w = MainWindow()
-    w.show()
-    sys.exit(app.exec())
+    if len(sys.argv) > 1 and sys.argv[1] in CLI_COMMANDS:
+        from core.cli import main
+        sys.exit(main(sys.argv[1:]))
+    sys.exit(run_gui())
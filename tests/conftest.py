@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# core.config reads and writes grsai_config.json in the working directory
+os.chdir(tempfile.mkdtemp(prefix="grsai-tests-"))
@@ -0,0 +1,12 @@
+import pytest
+
+from core.batch_runner import row_to_job
+
+@pytest.mark.parametrize("row", [[1, 2], "x", {"prompt": 5}, {"prompt": "  "}, {"prompt": "a", "model": ["m"]}])
+def test_row_to_job_rejects_bad_rows(row):
+    with pytest.raises(ValueError):
+        row_to_job(row)
+
+def test_row_to_job_defaults_api_type_from_model():
+    assert row_to_job({"prompt": "a cat", "model": "sora-image"})["api_type"] == "gpt_image"
+    assert row_to_job({"prompt": "a cat", "model": "nano-banana"})["api_type"] == "nano_banana"
@@ -0,0 +1,17 @@
+import os
+import time
+
+from core.downloader import remove_stale_parts
+
+def test_remove_stale_parts_keeps_recent_and_finished_files(tmp_path):
+    old = time.time() - 2 * 3600
+    for name in ("stale.png.part", "done.png"):
+        (tmp_path / name).write_bytes(b"x")
+        os.utime(tmp_path / name, (old, old))
+    (tmp_path / "running.png.part").write_bytes(b"x")
+
+    assert remove_stale_parts(str(tmp_path), 3600) == 1
+    assert sorted(os.listdir(tmp_path)) == ["done.png", "running.png.part"]
+
+def test_remove_stale_parts_ignores_missing_folder(tmp_path):
+    assert remove_stale_parts(str(tmp_path / "missing"), 3600) == 0
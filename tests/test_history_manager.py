@@ -0,0 +1,28 @@
+import json
+
+from core.history_manager import HistoryManager
+from core.history_storage import SqliteHistoryStorage
+
+def test_sqlite_search_waits_for_legacy_import(tmp_path):
+    legacy = [{"id": f"task-{i}", "prompt": f"castle {i}", "model": "nano-banana",
+               "created_at": "2025-01-01 00:00:00"} for i in range(100)]
+    (tmp_path / "legacy.json").write_text(json.dumps(legacy), encoding="utf-8")
+    storage = SqliteHistoryStorage(str(tmp_path / "history.db"), legacy_path=str(tmp_path / "legacy.json"))
+    manager = HistoryManager(storage)
+    searchable = []
+    manager.on_searchable(lambda: searchable.append(True))
+
+    # The database is still empty, its history is only imported by load()
+    assert not manager.can_search()
+    assert not searchable
+    tasks, total = manager.search("castle", limit=10)
+    assert total == 100
+    assert tasks[0]["id"] == "task-0"
+    assert manager.can_search()
+    assert searchable == [True]
+    manager.close()
+
+    # Once imported, a new manager can search right away
+    manager = HistoryManager(SqliteHistoryStorage(str(tmp_path / "history.db"), legacy_path=str(tmp_path / "legacy.json")))
+    assert manager.can_search()
+    manager.close()
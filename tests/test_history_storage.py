@@ -0,0 +1,64 @@
+import json
+
+from core.history_storage import JournalHistoryStorage, SqliteHistoryStorage
+
+def make_task(task_id, prompt="a prompt", **fields):
+    task = {"id": task_id, "prompt": prompt, "model": "nano-banana", "api_type": "nano_banana",
+            "status": "succeeded", "aspect_ratio": "1:1", "image_size": "1K",
+            "created_at": "2025-01-01 00:00:00"}
+    task.update(fields)
+    return task
+
+def journal_storage(tmp_path):
+    return JournalHistoryStorage(str(tmp_path / "snapshot.jsonl"), str(tmp_path / "journal.jsonl"),
+                                 str(tmp_path / "legacy.json"))
+
+def test_journal_append_after_torn_write(tmp_path):
+    storage = journal_storage(tmp_path)
+    storage.save(None, [make_task("a")])
+    storage.close()
+    # A crash in the middle of an append leaves half a record without its newline
+    with open(tmp_path / "journal.jsonl", "a", encoding="utf-8") as f:
+        f.write(json.dumps(make_task("torn"))[:20])
+
+    storage = journal_storage(tmp_path)
+    storage.load()
+    storage.save(None, [make_task("b")])
+    storage.close()
+
+    ids = [task["id"] for task in journal_storage(tmp_path).load()]
+    assert ids == ["b", "a"]
+
+def search_ids(storage, text="", **kwargs):
+    tasks, total = storage.search(text, **kwargs)
+    assert total == len(tasks)
+    return [task["id"] for task in tasks]
+
+def sqlite_storage(tasks):
+    storage = SqliteHistoryStorage(":memory:", legacy_path=None)
+    storage.save(None, tasks)
+    return storage
+
+def test_search_mixes_short_and_long_terms():
+    storage = sqlite_storage([make_task("cat", "a cat sitting"), make_task("dog", "a dog running"),
+                              make_task("tac", "cat on its own")])
+    assert search_ids(storage, "a cat") == ["tac", "cat"]
+    assert search_ids(storage, "z cat") == []
+    assert search_ids(storage, "si cat") == ["cat"]
+
+def test_search_term_with_model_filter():
+    storage = sqlite_storage([make_task("1", "red castle", model="nano-banana"),
+                              make_task("2", "red castle", model="nano-banana-pro"),
+                              make_task("3", "blue sky", model="nano-banana")])
+    assert search_ids(storage, "castle", model="nano-banana") == ["1"]
+    assert search_ids(storage, "CASTLE", model="nano-banana-pro") == ["2"]
+    assert search_ids(storage, "sky", model="nano-banana-pro") == []
+
+def test_search_date_range_out_of_insertion_order():
+    # Imported tasks need not be stored in the order they were created
+    storage = sqlite_storage([make_task("1", "castle", created_at="2025-03-01 10:00:00"),
+                              make_task("2", "castle", created_at="2025-01-01 10:00:00"),
+                              make_task("3", "castle", created_at="2025-02-01 10:00:00")])
+    assert search_ids(storage, "castle", date_from="2025-02-01 00:00:00") == ["3", "1"]
+    assert search_ids(storage, date_to="2025-02-28 23:59:59") == ["3", "2"]
+    assert search_ids(storage, "castle", date_from="2025-04-01 00:00:00") == []
@@ -0,0 +1,154 @@
+import os
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QFileDialog
+from qfluentwidgets import (CardWidget, PrimaryPushButton, PushButton, SpinBox, StrongBodyLabel, CaptionLabel,
+                            BodyLabel, ProgressBar, PlainTextEdit, InfoBar, InfoBarPosition)
+
+from core.config import cfg
+from core.task_engine import task_engine
+from core.batch_runner import load_batch_file, BatchRunner
+from ui.task_signals import BatchSignals
+
+class BatchPage(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.setObjectName("BatchPage")
+        self.batch_path = None
+        self.runner = None
+        self.batch_signals = None
+        self.initUI()
+
+        # Throughput changes while tasks are running, not only when a row finishes
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setInterval(1000)
+        self.stats_timer.timeout.connect(self.update_stats)
+
+    def initUI(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(30, 30, 30, 30)
+        layout.setSpacing(15)
+
+        settings_card = CardWidget()
+        settings_layout = QVBoxLayout(settings_card)
+
+        # Batch file
+        settings_layout.addWidget(CaptionLabel("Batch File (.csv or .jsonl)"))
+        file_layout = QHBoxLayout()
+        self.file_label = BodyLabel("No file selected")
+        self.file_btn = PushButton("Choose File")
+        self.file_btn.clicked.connect(self.choose_file)
+        file_layout.addWidget(self.file_label, 1)
+        file_layout.addWidget(self.file_btn)
+        settings_layout.addLayout(file_layout)
+        settings_layout.addWidget(CaptionLabel(
+            "Columns: prompt, model, api_type, aspect_ratio, image_size, size, variants, ref_images (separated by ;)"))
+
+        # Limits
+        settings_layout.addWidget(CaptionLabel("Max Concurrent Tasks"))
+        self.concurrent_spin = SpinBox()
+        self.concurrent_spin.setRange(1, 100)
+        self.concurrent_spin.setValue(cfg.get("batch_max_concurrent"))
+        settings_layout.addWidget(self.concurrent_spin)
+
+        settings_layout.addWidget(CaptionLabel("Submits per Minute (0 = unlimited)"))
+        self.rate_spin = SpinBox()
+        self.rate_spin.setRange(0, 600)
+        self.rate_spin.setValue(cfg.get("batch_submits_per_minute"))
+        settings_layout.addWidget(self.rate_spin)
+
+        layout.addWidget(settings_card)
+
+        self.start_btn = PrimaryPushButton("Start Batch")
+        self.start_btn.clicked.connect(self.on_start)
+        layout.addWidget(self.start_btn)
+
+        # Progress
+        self.progress_bar = ProgressBar()
+        self.progress_bar.setRange(0, 1)
+        self.progress_bar.setValue(0)
+        layout.addWidget(self.progress_bar)
+
+        self.stats_label = StrongBodyLabel("Ready")
+        self.stats_label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(self.stats_label)
+
+        self.log_edit = PlainTextEdit()
+        self.log_edit.setReadOnly(True)
+        layout.addWidget(self.log_edit, 1)
+
+    def choose_file(self):
+        fname, _ = QFileDialog.getOpenFileName(self, 'Open batch file', '', "Batch files (*.csv *.jsonl)")
+        if fname:
+            self.batch_path = fname
+            self.file_label.setText(os.path.basename(fname))
+
+    def on_start(self):
+        if self.runner is not None:
+            # The button acts as Cancel while a batch is running
+            self.runner.cancel()
+            self.start_btn.setEnabled(False)
+            self.stats_label.setText("Cancelling, waiting for submitted tasks...")
+            return
+
+        if not self.batch_path:
+            InfoBar.warning(title="Warning", content="Please choose a batch file.", parent=self, position=InfoBarPosition.TOP_RIGHT)
+            return
+
+        try:
+            jobs = load_batch_file(self.batch_path)
+        except (OSError, ValueError) as e:
+            InfoBar.error(title="Invalid Batch File", content=str(e), parent=self, position=InfoBarPosition.TOP_RIGHT)
+            return
+        if not jobs:
+            InfoBar.warning(title="Warning", content="The batch file has no rows.", parent=self, position=InfoBarPosition.TOP_RIGHT)
+            return
+
+        cfg.set("batch_max_concurrent", self.concurrent_spin.value())
+        cfg.set("batch_submits_per_minute", self.rate_spin.value())
+
+        self.batch_signals = BatchSignals()
+        self.batch_signals.row_finished.connect(self.on_row_finished)
+        self.batch_signals.finished_signal.connect(self.on_batch_finished)
+        self.runner = BatchRunner(jobs, self.concurrent_spin.value(), self.rate_spin.value(), self.batch_signals)
+
+        self.log_edit.clear()
+        self.progress_bar.setRange(0, len(jobs))
+        self.progress_bar.setValue(0)
+        self.start_btn.setText("Cancel Batch")
+        self.file_btn.setEnabled(False)
+        self.update_stats()
+        self.stats_timer.start()
+
+        task_engine.run(self.runner.run())
+
+    def on_row_finished(self, index, result):
+        job = self.runner.jobs[index]
+        if result["success"]:
+            line = f"#{index + 1} OK  {', '.join(result['result_paths'])}"
+        else:
+            line = f"#{index + 1} FAILED  {result['msg']}"
+        self.log_edit.appendPlainText(f"{line}  | {job['prompt'][:60]}")
+        self.update_stats()
+
+    def on_batch_finished(self, stats):
+        self.stats_timer.stop()
+        self.update_stats()
+        self.runner = None
+        self.batch_signals = None
+        self.start_btn.setText("Start Batch")
+        self.start_btn.setEnabled(True)
+        self.file_btn.setEnabled(True)
+        InfoBar.success(title="Batch Finished",
+                        content=f"{stats['succeeded']} succeeded, {stats['failed']} failed, {stats['skipped']} skipped.",
+                        parent=self, position=InfoBarPosition.TOP_RIGHT)
+
+    def update_stats(self):
+        if self.runner is None:
+            return
+        stats = self.runner.stats()
+        self.progress_bar.setValue(stats["done"])
+        self.stats_label.setText(
+            f"{stats['done']} / {stats['total']} done  |  {stats['running']} running  |  "
+            f"{stats['succeeded']} succeeded  |  {stats['failed']} failed  |  "
+            f"{stats['images']} images  |  {stats['images_per_minute']:.1f} images/min"
+        )
@@ -1,260 +1,13 @@
-import os
-import base64
-from PySide6.QtCore import Qt, Signal, QThread, QUrl, QSize, QRect
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QFileDialog, QFrame, QSizePolicy, QToolButton, QScrollArea, QSplitter
-from PySide6.QtGui import QPixmap, QDragEnterEvent, QDropEvent, QImage, QIcon, QPainter, QPen, QFont, QMouseEvent, QColor
-from qfluentwidgets import (CardWidget, PrimaryPushButton, ComboBox, TextEdit, 
-                            ImageLabel, StrongBodyLabel, CaptionLabel, InfoBar, InfoBarPosition, FluentIcon, TransparentToolButton)
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QSizePolicy, QSplitter
+from qfluentwidgets import (CardWidget, PrimaryPushButton, ComboBox, TextEdit, StrongBodyLabel, CaptionLabel,
+                            InfoBar, InfoBarPosition)
 
 from core.config import cfg
-from core.api_client import gpt_image_api
-from core.history_manager import history_mgr
-
-class ImageThumbnail(QWidget):
-    removed = Signal(str)
-
-    def __init__(self, path, parent=None):
-        super().__init__(parent)
-        self.path = path
-        self.setFixedSize(100, 100)
-        
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(0,0,0,0)
-        
-        self.img_label = QLabel()
-        self.img_label.setScaledContents(True)
-        self.img_label.setStyleSheet("border-radius: 8px; border: 1px solid #ddd;")
-        
-        pixmap = QPixmap(path)
-        if not pixmap.isNull():
-             # Crop center or just scale? Scale keeping aspect ratio by expanding then crop is better but complex.
-             # Simple scale for now
-             self.img_label.setPixmap(pixmap)
-        
-        layout.addWidget(self.img_label)
-        
-        # Close button overlay
-        self.close_btn = TransparentToolButton(FluentIcon.CLOSE, self)
-        self.close_btn.setFixedSize(24, 24)
-        self.close_btn.move(72, 4)
-        self.close_btn.clicked.connect(self.on_remove)
-        
-    def on_remove(self):
-        self.removed.emit(self.path)
-
-class ImageDropArea(QFrame):
-    imageDropped = Signal(str)
-
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setAcceptDrops(True)
-        self.setFrameStyle(QFrame.StyledPanel | QFrame.Sunken)
-        self.setStyleSheet("QFrame { border: 2px dashed #aaa; border-radius: 10px; background-color: transparent; }")
-        
-        self.layout = QVBoxLayout(self)
-        self.layout.setContentsMargins(0, 0, 0, 0)
-        
-        # Container for content
-        self.content_widget = QWidget(self)
-        self.content_layout = QVBoxLayout(self.content_widget)
-        self.content_layout.setAlignment(Qt.AlignCenter)
-        
-        self.label = QLabel("Drag & Drop Images Here\n(Max 13)\nOr Click to Select\n(Ctrl+V to Paste)")
-        self.label.setAlignment(Qt.AlignCenter)
-        self.content_layout.addWidget(self.label)
-        
-        # Scroll Area for thumbnails
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setStyleSheet("background: transparent; border: none;")
-        self.scroll_area.setFixedHeight(120)
-        self.scroll_area.hide()
-        
-        self.scroll_content = QWidget()
-        self.scroll_content.setStyleSheet("background: transparent;")
-        self.scroll_layout = QHBoxLayout(self.scroll_content)
-        self.scroll_layout.setAlignment(Qt.AlignLeft)
-        self.scroll_layout.setContentsMargins(10, 5, 10, 5)
-        self.scroll_layout.setSpacing(10)
-        
-        self.scroll_area.setWidget(self.scroll_content)
-        self.content_layout.addWidget(self.scroll_area)
-        
-        self.layout.addWidget(self.content_widget)
-        
-        # Clear All button (top right)
-        self.clear_btn = TransparentToolButton(FluentIcon.DELETE, self)
-        self.clear_btn.setFixedSize(30, 30)
-        self.clear_btn.setToolTip("Clear All Images")
-        self.clear_btn.move(self.width() - 35, 5)
-        self.clear_btn.clicked.connect(self.clear_images)
-        self.clear_btn.hide()
-        
-        # Paste button (bottom right)
-        self.paste_btn = TransparentToolButton(FluentIcon.PASTE, self)
-        self.paste_btn.setFixedSize(30, 30)
-        self.paste_btn.setToolTip("Paste from Clipboard")
-        self.paste_btn.clicked.connect(self.paste_from_clipboard)
-        
-        self.image_paths = []
-
-    def resizeEvent(self, event):
-        self.clear_btn.move(self.width() - 35, 5)
-        self.paste_btn.move(self.width() - 35, self.height() - 35)
-        super().resizeEvent(event)
-
-    def paste_from_clipboard(self):
-        clipboard = QApplication.clipboard()
-        mime_data = clipboard.mimeData()
-        
-        if mime_data.hasImage():
-            image = clipboard.image()
-            if not image.isNull():
-                import tempfile
-                from datetime import datetime
-                temp_dir = tempfile.gettempdir()
-                temp_path = os.path.join(temp_dir, f"paste_image_{int(datetime.now().timestamp())}.png")
-                image.save(temp_path, "PNG")
-                self.add_image(temp_path)
-                InfoBar.success(title="Pasted", content="Image pasted from clipboard.", parent=self, position=InfoBarPosition.TOP_RIGHT)
-                return
-
-        if mime_data.hasUrls():
-            for url in mime_data.urls():
-                path = url.toLocalFile()
-                if path.lower().endswith(('.png', '.jpg', '.jpeg', '.webp')):
-                    self.add_image(path)
-            InfoBar.success(title="Pasted", content="Image file(s) pasted from clipboard.", parent=self, position=InfoBarPosition.TOP_RIGHT)
-            return
-        
-        InfoBar.warning(title="No Image", content="No image found in clipboard.", parent=self, position=InfoBarPosition.TOP_RIGHT)
-
-    def dragEnterEvent(self, event: QDragEnterEvent):
-        if event.mimeData().hasUrls() or event.mimeData().hasImage():
-            event.accept()
-        else:
-            event.ignore()
-
-    def dropEvent(self, event: QDropEvent):
-        if event.mimeData().hasUrls():
-            for url in event.mimeData().urls():
-                path = url.toLocalFile()
-                if path.lower().endswith(('.png', '.jpg', '.jpeg', '.webp')):
-                    self.add_image(path)
-        elif event.mimeData().hasImage():
-            # Handle raw image data if needed
-            pass
-
-    def mousePressEvent(self, event):
-        if event.button() == Qt.LeftButton:
-            # If clicking on empty space, open dialog
-            # But we have thumbnails now, so we need to be careful not to block them?
-            # The thumbnails are in scroll_area which is a child.
-            # If we click on the frame but not on a child widget...
-            # Actually QScrollArea will handle its own clicks.
-            
-            fnames, _ = QFileDialog.getOpenFileNames(self, 'Open files', '', "Image files (*.jpg *.jpeg *.png *.webp)")
-            if fnames:
-                for fname in fnames:
-                    self.add_image(fname)
-
-    def add_image(self, path):
-        if len(self.image_paths) >= 13:
-            InfoBar.warning(title="Limit Reached", content="Maximum 13 images allowed.", parent=self, position=InfoBarPosition.TOP_RIGHT)
-            return
-            
-        if path in self.image_paths:
-             return
-
-        self.image_paths.append(path)
-        thumb = ImageThumbnail(path)
-        thumb.removed.connect(self.remove_image)
-        self.scroll_layout.addWidget(thumb)
-        self.update_ui_state()
-        self.imageDropped.emit(path)
-
-    def remove_image(self, path):
-        if path in self.image_paths:
-            self.image_paths.remove(path)
-            # Find widget and remove
-            for i in range(self.scroll_layout.count()):
-                item = self.scroll_layout.itemAt(i)
-                widget = item.widget()
-                if isinstance(widget, ImageThumbnail) and widget.path == path:
-                    widget.deleteLater()
-                    break
-            self.update_ui_state()
-
-    def clear_images(self):
-        self.image_paths = []
-        # Clear widgets
-        while self.scroll_layout.count():
-            item = self.scroll_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-        self.update_ui_state()
-        self.imageDropped.emit("")
-
-    def update_ui_state(self):
-        if self.image_paths:
-            self.label.hide()
-            self.scroll_area.show()
-            self.clear_btn.show()
-            self.clear_btn.raise_()
-        else:
-            self.label.show()
-            self.scroll_area.hide()
-            self.clear_btn.hide()
-
-class AspectRatioLabel(QLabel):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setAlignment(Qt.AlignCenter)
-        self.setStyleSheet("background-color: #f0f0f0; border: 1px solid #ddd; border-radius: 8px;")
-        self._pixmap = None
-
-    def setImage(self, path):
-        if path and os.path.exists(path):
-            self._pixmap = QPixmap(path)
-            self.update_pixmap()
-        else:
-            self._pixmap = None
-            self.clear()
-
-    def resizeEvent(self, event):
-        self.update_pixmap()
-        super().resizeEvent(event)
-
-    def update_pixmap(self):
-        if self._pixmap and not self._pixmap.isNull():
-            # Scale pixmap to fit the label size, keeping aspect ratio
-            # Use a slightly smaller size to ensure borders are visible
-            target_size = self.size() - QSize(4, 4) 
-            scaled = self._pixmap.scaled(target_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            super().setPixmap(scaled)
-
-class ModernToggleButton(TransparentToolButton):
-    """Modern toggle button for preview panel"""
-    
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setFixedSize(24, 24)
-        self.is_expanded = True  # True means right panel is visible
-        self.update_icon()
-    
-    def update_icon(self):
-        """Update icon based on expanded state"""
-        if self.is_expanded:
-            self.setIcon(FluentIcon.PAGE_RIGHT)
-            self.setToolTip("Collapse Preview")
-        else:
-            self.setIcon(FluentIcon.PAGE_LEFT)
-            self.setToolTip("Expand Preview")
-    
-    def set_expanded(self, expanded: bool):
-        """Set the expanded state and update the icon"""
-        self.is_expanded = expanded
-        self.update_icon()
+from core.task_engine import task_engine, gpt_image_job
+from ui.task_signals import TaskSignals
+from ui.reference_prep import PrepareReferencesThread
+from ui.image_widgets import ImageDropArea, AspectRatioLabel, ModernToggleButton
 
 class GptImageGeneratorPage(QWidget):
     def __init__(self, parent_window=None):
@@ -262,6 +15,11 @@ class GptImageGeneratorPage(QWidget):
         self.parent_window = parent_window
         self.setObjectName("GptImageGeneratorPage")
         self._previous_window_width = None  # Store the window width before collapsing
+        self.background_tasks = []  # Keep task listeners alive until their task finishes
+        self.current_task_signals = None  # Only the latest task reports to the status label and preview
+        self.prepare_thread = None  # Reference encoding in progress, if any
+        self.pending_job = None
+        self._variant_preview_signals = None  # Task whose first variant is already in the preview
         self.initUI()
 
     def initUI(self):
@@ -393,16 +151,12 @@ class GptImageGeneratorPage(QWidget):
     def keyPressEvent(self, event):
         if event.modifiers() == Qt.ControlModifier and event.key() == Qt.Key_V:
             clipboard = QApplication.clipboard()
-            mime_data = clipboard.mime_data()
+            mime_data = clipboard.mimeData()
             if mime_data.hasImage():
                 image = clipboard.image()
                 if not image.isNull():
-                    # Save to a temporary file
-                    import tempfile
-                    temp_dir = tempfile.gettempdir()
-                    temp_path = os.path.join(temp_dir, f"paste_image_{int(datetime.now().timestamp())}.png")
-                    image.save(temp_path, "PNG")
-                    self.drop_area.add_image(temp_path)
+                    # Kept in memory and encoded in the background, no temp file
+                    self.drop_area.add_image_data(image)
                     InfoBar.success(title="Pasted", content="Image pasted from clipboard.", parent=self, position=InfoBarPosition.TOP_RIGHT)
             elif mime_data.hasUrls():
                 # Handle file copy-paste
@@ -413,6 +167,12 @@ class GptImageGeneratorPage(QWidget):
                         break
 
     def on_generate(self):
+        if self.prepare_thread is not None:
+            # The button acts as Cancel while references are being prepared
+            self.prepare_thread.cancel()
+            self.status_label.setText("Cancelling...")
+            return
+
         prompt = self.prompt_edit.toPlainText().strip()
         if not prompt:
             InfoBar.warning(title="Warning", content="Please enter a prompt.", parent=self, position=InfoBarPosition.TOP_RIGHT)
@@ -427,33 +187,59 @@ class GptImageGeneratorPage(QWidget):
         cfg.set("gpt_image_last_size", size)
         cfg.set("gpt_image_last_variants", variants)
 
-        # Handle Images
-        ref_urls = []
-        # self.drop_area.image_paths is a list now
-        for img_path in self.drop_area.image_paths:
-            try:
-                with open(img_path, "rb") as img_file:
-                    b64_string = base64.b64encode(img_file.read()).decode('utf-8')
-                    # Guess mime type
-                    ext = os.path.splitext(img_path)[1].lower().replace('.', '')
-                    if ext == 'jpg': ext = 'jpeg'
-                    data_uri = f"data:image/{ext};base64,{b64_string}"
-                    ref_urls.append(data_uri)
-            except Exception as e:
-                print(f"Error processing image {img_path}: {e}")
+        job = gpt_image_job(prompt, model, size, variants, None, self.drop_area.references())
+        if not job["ref_images"]:
+            self.submit_job(job)
+            return
 
+        # Reading and encoding references happens off the UI thread
+        self.pending_job = job
+        self.gen_btn.setText("Cancel")
+        self.status_label.setText(f"Preparing reference images... 0/{len(job['ref_images'])}")
+        self.prepare_thread = PrepareReferencesThread(job["ref_images"])
+        self.prepare_thread.progress.connect(self.on_prepare_progress)
+        self.prepare_thread.finished_signal.connect(self.on_prepare_finished)
+        self.prepare_thread.start()
+
+    def on_prepare_progress(self, done, total):
+        self.status_label.setText(f"Preparing reference images... {done}/{total}")
+
+    def on_prepare_finished(self, ref_urls, ref_hashes, errors, cancelled):
+        job = self.pending_job
+        self.pending_job = None
+        # The signal is the last thing run() does, so this returns right away
+        self.prepare_thread.wait()
+        self.prepare_thread = None
+        self.gen_btn.setText("Generate Image")
+        if cancelled:
+            self.status_label.setText("Cancelled.")
+            return
+        for error in errors:
+            print(f"Error processing image: {error}")
+        if errors:
+            InfoBar.warning(title="Skipped Images", content="\n".join(errors), parent=self, position=InfoBarPosition.TOP_RIGHT)
+        job["ref_urls"] = ref_urls
+        # History points at the asset store, not at paths that may be temporary
+        job["ref_images"] = ref_hashes
+        self.submit_job(job)
+
+    def submit_job(self, job):
         # Submit Task
         self.gen_btn.setEnabled(False)
         self.status_label.setText("Submitting task...")
         
-        # Run in background to avoid freezing UI
-        self.submit_thread = GptSubmitTaskThread(prompt, model, size, variants, ref_urls)
-        self.submit_thread.finished.connect(self.on_submit_finished)
-        self.submit_thread.start()
+        # Submit, polling and download all run on the task engine's event loop
+        task_signals = TaskSignals()
+        task_signals.submitted.connect(self.on_submit_finished)
+        task_signals.update_signal.connect(self.on_poll_update)
+        task_signals.download_signal.connect(self.on_download_progress)
+        task_signals.partial_signal.connect(self.on_partial_image)
+        task_signals.variant_signal.connect(self.on_variant_ready)
+        task_signals.finished_signal.connect(self.on_poll_finished)
+        self.background_tasks.append(task_signals)
+        self.current_task_signals = task_signals
         
-        # Keep track of background threads
-        if not hasattr(self, 'background_threads'):
-            self.background_threads = []
+        task_engine.submit(job, task_signals)
 
     def on_submit_finished(self, result):
         self.gen_btn.setEnabled(True)
@@ -461,50 +247,49 @@ class GptImageGeneratorPage(QWidget):
             task_id = result["data"]["id"]
             InfoBar.success(title="Success", content="Task submitted successfully.", parent=self, position=InfoBarPosition.TOP_RIGHT)
             self.status_label.setText(f"Task ID: {task_id} - Waiting for results...")
-            
-            # Add to history
-            # Pass the list of paths
-            history_mgr.add_gpt_task(
-                task_id, 
-                self.prompt_edit.toPlainText(), 
-                self.model_combo.currentText(),
-                self.size_combo.currentText(),
-                self.variants_combo.currentText(),
-                self.drop_area.image_paths
-            )
-            
-            # If there was a previous polling thread active on the UI, disconnect it from UI updates
-            if hasattr(self, 'current_poll_thread') and self.current_poll_thread.isRunning():
-                try:
-                    self.current_poll_thread.update_signal.disconnect(self.on_poll_update)
-                    self.current_poll_thread.finished_signal.disconnect(self.on_poll_finished)
-                except:
-                    pass
-            
-            # Start polling for this specific task
-            self.current_poll_thread = GptPollTaskThread(task_id)
-            self.current_poll_thread.update_signal.connect(self.on_poll_update)
-            self.current_poll_thread.finished_signal.connect(self.on_poll_finished)
-            
-            # Add to background threads to keep reference
-            self.background_threads.append(self.current_poll_thread)
-            
-            # Clean up finished threads from list
-            self.current_poll_thread.finished.connect(lambda: self.cleanup_thread(self.current_poll_thread))
-            
-            self.current_poll_thread.start()
-            
         else:
+            self.cleanup_task(self.sender())
             InfoBar.error(title="Error", content=f"Submission failed: {result.get('msg')}", parent=self, position=InfoBarPosition.TOP_RIGHT)
             self.status_label.setText("Submission failed.")
 
-    def cleanup_thread(self, thread):
-        if thread in self.background_threads:
-            self.background_threads.remove(thread)
+    def cleanup_task(self, task_signals):
+        if task_signals in self.background_tasks:
+            self.background_tasks.remove(task_signals)
+        if task_signals is self.current_task_signals:
+            self.current_task_signals = None
 
     def on_poll_update(self, progress, status):
+        if self.sender() is not self.current_task_signals:
+            return
         self.status_label.setText(f"Status: {status} - Progress: {progress}%")
 
+    def on_download_progress(self, received, total):
+        if self.sender() is not self.current_task_signals:
+            return
+        if total:
+            self.status_label.setText(f"Downloading result... {received * 100 // total}% ({received // 1024} / {total // 1024} KB)")
+        else:
+            self.status_label.setText(f"Downloading result... {received // 1024} KB")
+
+    def on_partial_image(self, index, part_path):
+        if self.sender() is not self.current_task_signals or self.is_preview_collapsed:
+            return
+        # Preview the first variant until any variant has landed
+        if index != 0 or self._variant_preview_signals is self.sender():
+            return
+        self.preview_label.setPartialImage(part_path)
+
+    def on_variant_ready(self, index, result_path):
+        if self.sender() is not self.current_task_signals:
+            return
+        # Show the first variant that lands, the rest keep downloading
+        if self._variant_preview_signals is self.sender():
+            return
+        self._variant_preview_signals = self.sender()
+        self._last_generated_image = result_path
+        if not self.is_preview_collapsed:
+            self.preview_label.setImage(result_path)
+
     def toggle_preview(self):
         """Toggle the collapsed state of the entire right panel"""
         self.is_preview_collapsed = not self.is_preview_collapsed
@@ -538,6 +323,11 @@ class GptImageGeneratorPage(QWidget):
                 self.preview_label.setImage(self._last_generated_image)
 
     def on_poll_finished(self, task_id, success, result_path, msg):
+        task_signals = self.sender()
+        is_current = task_signals is self.current_task_signals
+        self.cleanup_task(task_signals)
+        if not is_current:
+            return
         if success:
             self.status_label.setText("Generation Complete!")
             # Save the last generated image path for later use
@@ -545,121 +335,15 @@ class GptImageGeneratorPage(QWidget):
             # Only set the image if preview is not collapsed
             if not self.is_preview_collapsed:
                 self.preview_label.setImage(result_path)
-            InfoBar.success(title="Done", content="Image generated successfully.", parent=self, position=InfoBarPosition.TOP_RIGHT)
+            if msg == "Success":
+                InfoBar.success(title="Done", content="Image generated successfully.", parent=self, position=InfoBarPosition.TOP_RIGHT)
+            else:
+                # Some variants failed to download
+                InfoBar.warning(title="Partially Done", content=msg, parent=self, position=InfoBarPosition.TOP_RIGHT)
         else:
             self.status_label.setText(f"Failed: {msg}")
+            # Drop any half-downloaded preview and go back to what was shown before
+            self.preview_label.setImage(getattr(self, '_last_generated_image', None))
             InfoBar.error(title="Failed", content=msg, parent=self, position=InfoBarPosition.TOP_RIGHT)
 
-class GptSubmitTaskThread(QThread):
-    finished = Signal(dict)
-
-    def __init__(self, prompt, model, size, variants, ref_urls):
-        super().__init__()
-        self.prompt = prompt
-        self.model = model
-        self.size = size
-        self.variants = variants
-        self.ref_urls = ref_urls
-
-    def run(self):
-        res = gpt_image_api.submit_task(self.prompt, self.model, self.size, self.variants, self.ref_urls)
-        self.finished.emit(res)
-
-class GptPollTaskThread(QThread):
-    update_signal = Signal(int, str)
-    finished_signal = Signal(str, bool, str, str)
-
-    def __init__(self, task_id):
-        super().__init__()
-        self.task_id = task_id
-
-    def run(self):
-        import time
-        import requests
-        
-        error_count = 0
-        while True:
-            try:
-                res = gpt_image_api.get_task_result(self.task_id)
-                error_count = 0 # Reset on success
-            except Exception as e:
-                error_count += 1
-                if error_count > 5:
-                    self.finished_signal.emit(self.task_id, False, "", f"Network error: {str(e)}")
-                    return
-                time.sleep(2)
-                continue
-
-            if res.get("code") != 0:
-                # If task not found or other API error, maybe wait a bit or fail
-                if res.get("code") == -22: # Task not found, maybe not ready yet?
-                    time.sleep(2)
-                    continue
-                self.finished_signal.emit(self.task_id, False, "", res.get("msg", "Unknown error"))
-                return
-
-            data = res.get("data", {})
-            status = data.get("status")
-            progress = data.get("progress", 0)
-            
-            self.update_signal.emit(progress, status)
-
-            if status == "succeeded":
-                results = data.get("results", [])
-                if results:
-                    # Download all images for multi-variant support
-                    downloaded_files = []
-                    timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
-                    
-                    for i, result in enumerate(results):
-                        img_url = result.get("url")
-                        if not img_url:
-                            continue
-                            
-                        try:
-                            img_data = requests.get(img_url).content
-                            ext = "png" # Default
-                            if ".jpg" in img_url: ext = "jpg"
-                            if ".jpeg" in img_url: ext = "jpeg"
-                            
-                            # Add suffix for multiple images
-                            if len(results) > 1:
-                                filename = f"grsai_{timestamp}_{i+1}.{ext}"
-                            else:
-                                filename = f"grsai_{timestamp}.{ext}"
-                                
-                            output_dir = cfg.get("output_folder")
-                            if not os.path.exists(output_dir):
-                                os.makedirs(output_dir)
-                                
-                            filepath = os.path.join(output_dir, filename)
-                            with open(filepath, "wb") as f:
-                                f.write(img_data)
-                                
-                            downloaded_files.append(filepath)
-                        except Exception as e:
-                            print(f"Error downloading image {i+1}: {e}")
-                    
-                    if downloaded_files:
-                        # Use first image for preview, but store all paths
-                        preview_url = results[0].get("url")
-                        history_mgr.update_gpt_task(self.task_id, "succeeded", result_path=downloaded_files[0], preview_url=preview_url)
-                        self.finished_signal.emit(self.task_id, True, downloaded_files[0], "Success")
-                    else:
-                        history_mgr.update_gpt_task(self.task_id, "failed", failure_reason="Failed to download any images")
-                        self.finished_signal.emit(self.task_id, False, "", "Failed to download any images")
-                else:
-                    history_mgr.update_gpt_task(self.task_id, "failed", failure_reason="No results found")
-                    self.finished_signal.emit(self.task_id, False, "", "No results found")
-                return
-
-            elif status == "failed":
-                reason = data.get("failure_reason", "Unknown")
-                history_mgr.update_gpt_task(self.task_id, "failed", failure_reason=reason)
-                self.finished_signal.emit(self.task_id, False, "", reason)
-                return
-
-            time.sleep(2)
-
 from PySide6.QtWidgets import QApplication
-from datetime import datetime
@@ -1,11 +1,15 @@
 import os
-from PySide6.QtCore import Qt, QSize, Signal, QUrl
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QScrollArea, QFrame, QDialog, QTextBrowser
-from PySide6.QtGui import QPixmap, QDesktopServices, QIcon, QFontMetrics, QImageReader
-from qfluentwidgets import (CardWidget, StrongBodyLabel, BodyLabel, CaptionLabel, 
-                            TransparentPushButton, FluentIcon, ImageLabel, ScrollArea, MessageBoxBase, SubtitleLabel)
+from collections import OrderedDict
+from PySide6.QtCore import Qt, QSize, Signal, QUrl, QTimer, QRect, QRectF, QAbstractListModel, QModelIndex, QEvent
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTextBrowser, QListView, QStyledItemDelegate,
+                               QStyle, QAbstractItemView)
+from PySide6.QtGui import QDesktopServices, QFontMetrics, QColor, QPainter, QPainterPath, QFont
+from qfluentwidgets import (CaptionLabel, TransparentPushButton, FluentIcon, MessageBoxBase,
+                            SubtitleLabel, SearchLineEdit, ComboBox, CalendarPicker, SmoothScrollDelegate, isDarkTheme)
 
 from core.history_manager import history_mgr
+from ui.task_signals import HistorySignals
+from ui.thumbnail_loader import ThumbnailLoader
 
 class TaskDetailsDialog(MessageBoxBase):
     def __init__(self, task_data, parent=None):
@@ -58,237 +62,393 @@ class TaskDetailsDialog(MessageBoxBase):
         self.cancelButton.hide()
         self.widget.setMinimumWidth(500)
 
-class ClickableLabel(QLabel):
-    clicked = Signal()
-    def mousePressEvent(self, event):
-        self.clicked.emit()
+TASK_ROLE = Qt.UserRole + 1
 
-class HistoryItem(CardWidget):
-    regenerateRequested = Signal(dict)
+STATUS_COLORS = {
+    "succeeded": QColor("green"),
+    "failed": QColor("red")
+}
 
-    def __init__(self, task_data, parent=None):
+def has_result(task):
+    return task["status"] in ("succeeded", "partial") and bool(task["result_path"])
+
+def size_info(task):
+    # Handle different size fields based on API type
+    if task.get('api_type', 'nano_banana') == 'gpt_image':
+        return f"Model: {task['model']} | Size: {task['size']} | Variants: {task['variants']}"
+    return f"Model: {task['model']} | Size: {task['image_size']} | Ratio: {task['aspect_ratio']}"
+
+class HistoryListModel(QAbstractListModel):
+    """History rows for the current search, fetched from history_mgr a page at a time.
+
+    rowCount() is the full number of matches so the scroll bar spans the whole
+    history, but only the most recently used MAX_PAGES pages are kept in memory.
+    """
+    PAGE_SIZE = 100
+    MAX_PAGES = 10
+
+    def __init__(self, parent=None):
         super().__init__(parent)
-        self.task_data = task_data
-        self.setFixedHeight(120)
-        
-        layout = QHBoxLayout(self)
-        layout.setContentsMargins(16, 16, 16, 16)
-        
-        # Thumbnail - Use standard QLabel to ensure fixed size works reliably
-        self.thumb = QLabel()
-        self.thumb.setFixedSize(88, 88)
-        self.thumb.setStyleSheet("background-color: #eee; border-radius: 8px; border: 1px solid #ddd;")
-        self.thumb.setScaledContents(True)
-        
-        if task_data["status"] == "succeeded" and task_data["result_path"] and os.path.exists(task_data["result_path"]):
-            # Optimized loading using QImageReader
-            reader = QImageReader(task_data["result_path"])
-            # Scale to a reasonable thumbnail size (e.g. 2x for high DPI)
-            reader.setScaledSize(QSize(176, 176))
-            image = reader.read()
-            
-            if not image.isNull():
-                self.thumb.setPixmap(QPixmap.fromImage(image))
-            
-            self.thumb.setCursor(Qt.PointingHandCursor)
-            self.thumb.mousePressEvent = self.on_thumb_click
+        self.query = ""
+        self.filters = {}
+        self.total = 0
+        self.pages = OrderedDict()
+
+    def set_query(self, query, filters):
+        self.query = query
+        self.filters = filters
+        self.refresh()
+
+    def refresh(self):
+        self.beginResetModel()
+        self.pages.clear()
+        tasks, self.total = history_mgr.search(self.query, 0, self.PAGE_SIZE, **self.filters)
+        self.pages[0] = tasks
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self.total
+
+    def task_at(self, row):
+        page_no = row // self.PAGE_SIZE
+        page = self.pages.get(page_no)
+        if page is None:
+            page, _ = history_mgr.search(self.query, page_no * self.PAGE_SIZE, self.PAGE_SIZE, **self.filters)
+            self.pages[page_no] = page
+            while len(self.pages) > self.MAX_PAGES:
+                self.pages.popitem(last=False)
         else:
-            self.thumb.setText("No Image")
-            self.thumb.setAlignment(Qt.AlignCenter)
-            
-        layout.addWidget(self.thumb)
-        
-        # Info
-        info_layout = QVBoxLayout()
-        info_layout.setSpacing(4)
-        
-        # Prompt Label - Clickable and Elided
-        self.prompt_label = ClickableLabel()
-        self.prompt_label.setCursor(Qt.PointingHandCursor)
-        self.prompt_label.clicked.connect(self.show_details)
-        
-        # Elide text
-        font = StrongBodyLabel().font()
-        self.prompt_label.setFont(font)
-        metrics = QFontMetrics(font)
-        elided_text = metrics.elidedText(task_data["prompt"], Qt.ElideRight, 400) # Approx width
-        self.prompt_label.setText(elided_text)
-        # Tooltip for quick view
-        self.prompt_label.setToolTip("Click to view full details")
-        
-        info_layout.addWidget(self.prompt_label)
-        
-        # Handle different size fields based on API type
-        api_type = task_data.get('api_type', 'nano_banana')
-        if api_type == 'gpt_image':
-            size_info = f"Model: {task_data['model']} | Size: {task_data['size']} | Variants: {task_data['variants']}"
+            self.pages.move_to_end(page_no)
+        offset = row % self.PAGE_SIZE
+        # The history can shrink between refreshes
+        return page[offset] if offset < len(page) else None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == TASK_ROLE:
+            return self.task_at(index.row())
+        if role == Qt.DisplayRole:
+            task = self.task_at(index.row())
+            return task["prompt"] if task else None
+        return None
+
+class HistoryItemDelegate(QStyledItemDelegate):
+    """Paints one history card per row; only visible rows are ever painted.
+
+    Clicks on the thumbnail, the prompt and the painted buttons are reported
+    through the signals below.
+    """
+    regenerateRequested = Signal(dict)
+    detailsRequested = Signal(dict)
+    openImageRequested = Signal(dict)
+    openFolderRequested = Signal(dict)
+
+    ROW_HEIGHT = 130
+
+    def __init__(self, thumbnail_loader, parent=None):
+        super().__init__(parent)
+        self.thumbnail_loader = thumbnail_loader
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    def layout(self, rect, task):
+        card = rect.adjusted(20, 5, -20, -5)
+        thumb = QRect(card.left() + 16, card.top() + 16, 88, 88)
+        text_left = thumb.right() + 16
+        text_width = max(card.right() - 240 - text_left, 50)
+        rects = {
+            "card": card,
+            "thumb": thumb,
+            "prompt": QRect(text_left, card.top() + 16, text_width, 24),
+            "info": QRect(text_left, card.top() + 46, text_width, 20),
+            "created": QRect(text_left, card.top() + 72, text_width, 18),
+            "status": QRect(card.right() - 220, card.top() + 20, 204, 24),
+            "regenerate": QRect(card.right() - 228, card.bottom() - 42, 108, 30)
+        }
+        if has_result(task):
+            rects["open"] = QRect(card.right() - 116, card.bottom() - 42, 108, 30)
+        return rects
+
+    def paint(self, painter, option, index):
+        task = index.data(TASK_ROLE)
+        if task is None:
+            return
+        rects = self.layout(option.rect, task)
+        dark = isDarkTheme()
+        text_color = QColor(255, 255, 255) if dark else QColor(0, 0, 0)
+        caption_color = QColor(255, 255, 255, 150) if dark else QColor(0, 0, 0, 150)
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        # Card
+        hovered = option.state & QStyle.State_MouseOver
+        if dark:
+            background = QColor(255, 255, 255, 21 if hovered else 13)
         else:
-            size_info = f"Model: {task_data['model']} | Size: {task_data['image_size']} | Ratio: {task_data['aspect_ratio']}"
-        
-        info_layout.addWidget(BodyLabel(size_info))
-        info_layout.addWidget(CaptionLabel(task_data["created_at"]))
-        
-        layout.addLayout(info_layout)
-        layout.addStretch()
-        
-        # Status
-        status_layout = QVBoxLayout()
-        status_layout.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
-        
-        status_text = task_data["status"].capitalize()
-        status_label = StrongBodyLabel(status_text)
-        if task_data["status"] == "succeeded":
-            status_label.setStyleSheet("color: green;")
-        elif task_data["status"] == "failed":
-            status_label.setStyleSheet("color: red;")
+            background = QColor(250, 250, 250) if hovered else QColor(255, 255, 255, 170)
+        painter.setPen(QColor(0, 0, 0, 48) if dark else QColor(0, 0, 0, 19))
+        painter.setBrush(background)
+        painter.drawRoundedRect(QRectF(rects["card"]).adjusted(0.5, 0.5, -0.5, -0.5), 8, 8)
+
+        # Thumbnail
+        thumb = rects["thumb"]
+        path = QPainterPath()
+        path.addRoundedRect(QRectF(thumb), 8, 8)
+        painter.fillPath(path, QColor(60, 60, 60) if dark else QColor("#eee"))
+        if has_result(task):
+            # Decoded in the background, the placeholder stays until loaded() triggers a repaint
+            pixmap = self.thumbnail_loader.pixmap(task["result_path"])
+            missing = self.thumbnail_loader.has_failed(task["result_path"])
         else:
-            status_label.setStyleSheet("color: orange;")
-            
-        status_layout.addWidget(status_label)
-        
-        # Buttons Layout
-        btn_layout = QHBoxLayout()
-        btn_layout.setSpacing(5)
-        
-        # Regenerate Button
-        regen_btn = TransparentPushButton(FluentIcon.SYNC, "Regenerate")
-        regen_btn.setToolTip("Run this task again")
-        regen_btn.clicked.connect(self.on_regenerate)
-        btn_layout.addWidget(regen_btn)
-
-        if task_data["status"] == "succeeded" and task_data["result_path"]:
-            open_btn = TransparentPushButton(FluentIcon.FOLDER, "Open Folder")
-            open_btn.clicked.connect(self.open_folder)
-            btn_layout.addWidget(open_btn)
-            
-        status_layout.addLayout(btn_layout)
-        layout.addLayout(status_layout)
+            pixmap = None
+            missing = True
+        if pixmap is not None:
+            # Center crop to a square
+            side = min(pixmap.width(), pixmap.height())
+            source = QRect((pixmap.width() - side) // 2, (pixmap.height() - side) // 2, side, side)
+            painter.save()
+            painter.setClipPath(path)
+            painter.drawPixmap(thumb, pixmap, source)
+            painter.restore()
+        elif missing:
+            painter.setPen(caption_color)
+            painter.drawText(thumb, Qt.AlignCenter, "No Image")
 
-    def on_regenerate(self):
-        self.regenerateRequested.emit(self.task_data)
+        # Prompt, settings and date
+        font = QFont(option.font)
+        font.setBold(True)
+        painter.setFont(font)
+        painter.setPen(text_color)
+        prompt = " ".join(task["prompt"].split())
+        painter.drawText(rects["prompt"], Qt.AlignLeft | Qt.AlignVCenter,
+                         QFontMetrics(font).elidedText(prompt, Qt.ElideRight, rects["prompt"].width()))
+        painter.setFont(option.font)
+        painter.drawText(rects["info"], Qt.AlignLeft | Qt.AlignVCenter,
+                         QFontMetrics(option.font).elidedText(size_info(task), Qt.ElideRight, rects["info"].width()))
+        painter.setPen(caption_color)
+        painter.drawText(rects["created"], Qt.AlignLeft | Qt.AlignVCenter, task["created_at"])
 
-    def show_details(self):
-        w = TaskDetailsDialog(self.task_data, self.window())
-        w.exec_()
+        # Status
+        painter.setFont(font)
+        painter.setPen(STATUS_COLORS.get(task["status"], QColor("orange")))
+        painter.drawText(rects["status"], Qt.AlignRight | Qt.AlignVCenter, task["status"].capitalize())
 
-    def on_thumb_click(self, event):
-        if self.task_data["result_path"] and os.path.exists(self.task_data["result_path"]):
-            # Open with system default viewer
-            QDesktopServices.openUrl(QUrl.fromLocalFile(self.task_data["result_path"]))
+        # Buttons
+        painter.setFont(option.font)
+        self.paint_button(painter, rects["regenerate"], FluentIcon.SYNC, "Regenerate", text_color)
+        if "open" in rects:
+            self.paint_button(painter, rects["open"], FluentIcon.FOLDER, "Open Folder", text_color)
+        painter.restore()
 
-    def open_folder(self):
-        if self.task_data["result_path"]:
-            folder = os.path.dirname(self.task_data["result_path"])
-            QDesktopServices.openUrl(QUrl.fromLocalFile(folder))
-            
-from PySide6.QtCore import QUrl
+    def paint_button(self, painter, rect, icon, text, color):
+        icon.render(painter, QRectF(rect.left() + 8, rect.center().y() - 7, 14, 14))
+        painter.setPen(color)
+        painter.drawText(rect.adjusted(28, 0, 0, 0), Qt.AlignLeft | Qt.AlignVCenter, text)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() != QEvent.MouseButtonRelease or event.button() != Qt.LeftButton:
+            return False
+        task = index.data(TASK_ROLE)
+        if task is None:
+            return False
+        rects = self.layout(option.rect, task)
+        pos = event.position().toPoint()
+        if rects["regenerate"].contains(pos):
+            self.regenerateRequested.emit(task)
+        elif "open" in rects and rects["open"].contains(pos):
+            self.openFolderRequested.emit(task)
+        elif rects["thumb"].contains(pos) and has_result(task):
+            self.openImageRequested.emit(task)
+        elif rects["prompt"].contains(pos):
+            self.detailsRequested.emit(task)
+        else:
+            return False
+        return True
 
 class HistoryPage(QWidget):
     def __init__(self):
         super().__init__()
         self.setObjectName("HistoryPage")
-        self.current_page = 1
-        self.items_per_page = 5
         self.initUI()
 
+        # Search as you type, once typing pauses
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(300)
+        self.search_timer.timeout.connect(self.refresh_data)
+        self.search_edit.textChanged.connect(self.search_timer.start)
+
+        # The history may still be loading or being indexed in the background
+        self.history_signals = HistorySignals(self)
+        self.history_signals.searchable.connect(self.on_history_searchable)
+        history_mgr.on_searchable(self.history_signals.searchable.emit)
+
     def initUI(self):
         layout = QVBoxLayout(self)
         layout.setContentsMargins(0, 0, 0, 0)
         
-        # Top bar with Refresh
+        # Top bar with Search and Refresh
         top_layout = QHBoxLayout()
         top_layout.setContentsMargins(20, 10, 20, 0)
-        top_layout.addStretch()
+        self.search_edit = SearchLineEdit()
+        self.search_edit.setPlaceholderText("Search prompts")
+        self.search_edit.searchSignal.connect(self.refresh_data)
+        self.search_edit.clearSignal.connect(self.refresh_data)
+        top_layout.addWidget(self.search_edit, 1)
         self.refresh_btn = TransparentPushButton(FluentIcon.SYNC, "Refresh")
         self.refresh_btn.clicked.connect(self.refresh_data)
         top_layout.addWidget(self.refresh_btn)
         layout.addLayout(top_layout)
-        
-        self.scroll = ScrollArea()
-        self.scroll.setWidgetResizable(True)
-        self.scroll.setStyleSheet("QScrollArea { border: none; background-color: transparent; }")
-        
-        self.container = QWidget()
-        self.container.setStyleSheet("background-color: transparent;")
-        self.vbox = QVBoxLayout(self.container)
-        self.vbox.setSpacing(10)
-        self.vbox.setAlignment(Qt.AlignTop)
-        
-        self.scroll.setWidget(self.container)
-        layout.addWidget(self.scroll)
-        
-        # Pagination
-        pagination_layout = QHBoxLayout()
-        pagination_layout.setContentsMargins(0, 10, 0, 10)
-        pagination_layout.setAlignment(Qt.AlignCenter)
-        
-        self.prev_btn = TransparentPushButton(FluentIcon.LEFT_ARROW, "Previous")
-        self.prev_btn.clicked.connect(self.prev_page)
-        
-        self.page_label = StrongBodyLabel("1 / 1")
-        
-        self.next_btn = TransparentPushButton(FluentIcon.RIGHT_ARROW, "Next")
-        self.next_btn.clicked.connect(self.next_page)
-        
-        pagination_layout.addWidget(self.prev_btn)
-        pagination_layout.addSpacing(20)
-        pagination_layout.addWidget(self.page_label)
-        pagination_layout.addSpacing(20)
-        pagination_layout.addWidget(self.next_btn)
-        
-        layout.addLayout(pagination_layout)
-        
+
+        # Filters, the first entry of each combo box means no filter
+        filter_layout = QHBoxLayout()
+        filter_layout.setContentsMargins(20, 5, 20, 0)
+        self.filter_combos = {}
+        for column, label in (("model", "All Models"), ("api_type", "All APIs"),
+                              ("status", "All Statuses"), ("ratio", "All Sizes")):
+            combo = ComboBox()
+            combo.addItem(label)
+            combo.currentIndexChanged.connect(self.refresh_data)
+            self.filter_combos[column] = combo
+            filter_layout.addWidget(combo)
+        self.date_from_picker = CalendarPicker()
+        self.date_from_picker.setText("From")
+        self.date_from_picker.setResetEnabled(True)
+        self.date_from_picker.dateChanged.connect(self.refresh_data)
+        self.date_to_picker = CalendarPicker()
+        self.date_to_picker.setText("To")
+        self.date_to_picker.setResetEnabled(True)
+        self.date_to_picker.dateChanged.connect(self.refresh_data)
+        filter_layout.addWidget(self.date_from_picker)
+        filter_layout.addWidget(self.date_to_picker)
+        filter_layout.addStretch()
+        layout.addLayout(filter_layout)
+
+        # Virtualized list: rows are painted by the delegate, no widget per task
+        self.model = HistoryListModel(self)
+        self.thumbnail_loader = ThumbnailLoader(parent=self)
+        self.delegate = HistoryItemDelegate(self.thumbnail_loader, self)
+        self.delegate.regenerateRequested.connect(self.on_regenerate_requested)
+        self.delegate.detailsRequested.connect(self.show_details)
+        self.delegate.openImageRequested.connect(self.open_image)
+        self.delegate.openFolderRequested.connect(self.open_folder)
+
+        self.list_view = QListView()
+        self.list_view.setModel(self.model)
+        self.list_view.setItemDelegate(self.delegate)
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.list_view.setSelectionMode(QAbstractItemView.NoSelection)
+        self.list_view.setMouseTracking(True)
+        self.list_view.setStyleSheet("QListView { border: none; background-color: transparent; }")
+        self.scroll_delegate = SmoothScrollDelegate(self.list_view)
+        layout.addWidget(self.list_view)
+
+        self.thumbnail_loader.loaded.connect(self.list_view.viewport().update)
+        # Rows that scrolled away should not keep the decoder busy
+        self.retain_timer = QTimer(self)
+        self.retain_timer.setSingleShot(True)
+        self.retain_timer.setInterval(50)
+        self.retain_timer.timeout.connect(self.retain_visible_thumbnails)
+        self.list_view.verticalScrollBar().valueChanged.connect(self.retain_timer.start)
+
+        self.count_label = CaptionLabel("")
+        self.count_label.setAlignment(Qt.AlignCenter)
+        self.count_label.setContentsMargins(0, 5, 0, 10)
+        layout.addWidget(self.count_label)
+
     def showEvent(self, event):
+        self.update_filter_choices()
         self.load_history()
         super().showEvent(event)
 
-    def refresh_data(self):
-        self.current_page = 1
-        self.load_history()
-
-    def prev_page(self):
-        if self.current_page > 1:
-            self.current_page -= 1
+    def on_history_searchable(self):
+        if self.isVisible():
+            self.update_filter_choices()
             self.load_history()
 
-    def next_page(self):
-        self.current_page += 1
+    def update_filter_choices(self):
+        if not history_mgr.can_search():
+            return
+        for column, combo in self.filter_combos.items():
+            current = combo.currentText() if combo.currentIndex() > 0 else None
+            combo.blockSignals(True)
+            while combo.count() > 1:
+                combo.removeItem(1)
+            combo.addItems([str(v) for v in history_mgr.distinct(column)])
+            index = combo.findText(current) if current else 0
+            combo.setCurrentIndex(max(index, 0))
+            combo.blockSignals(False)
+
+    def current_filters(self):
+        filters = {}
+        for column, combo in self.filter_combos.items():
+            if combo.currentIndex() > 0:
+                filters[column] = combo.currentText()
+        date_from = self.date_from_picker.getDate()
+        if date_from.isValid():
+            filters["date_from"] = date_from.toString("yyyy-MM-dd") + " 00:00:00"
+        date_to = self.date_to_picker.getDate()
+        if date_to.isValid():
+            filters["date_to"] = date_to.toString("yyyy-MM-dd") + " 23:59:59"
+        return filters
+
+    def refresh_data(self, *args):
+        self.search_timer.stop()
         self.load_history()
+        self.list_view.scrollToTop()
 
     def load_history(self):
-        # Clear existing
-        for i in range(self.vbox.count()):
-            item = self.vbox.itemAt(i)
-            if item.widget():
-                item.widget().deleteLater()
-                
-        all_tasks = history_mgr.get_all_tasks()
-        total_items = len(all_tasks)
-        total_pages = (total_items + self.items_per_page - 1) // self.items_per_page
-        if total_pages == 0: total_pages = 1
-        
-        if self.current_page > total_pages:
-            self.current_page = total_pages
-        if self.current_page < 1:
-            self.current_page = 1
-            
-        start_idx = (self.current_page - 1) * self.items_per_page
-        end_idx = min(start_idx + self.items_per_page, total_items)
-        
-        current_tasks = all_tasks[start_idx:end_idx]
-        
-        if not current_tasks:
-            self.vbox.addWidget(BodyLabel("No history yet."))
+        if not history_mgr.can_search():
+            # on_history_searchable() loads the list once the history can be searched
+            self.count_label.setText("Loading history...")
+            return
+        # Filtering and paging happen in the history storage; keep the scroll position across reloads
+        scroll_value = self.list_view.verticalScrollBar().value()
+        query = self.search_edit.text().strip()
+        filters = self.current_filters()
+        # Files may have appeared or been repaired since the last look
+        self.thumbnail_loader.failed.clear()
+        self.model.set_query(query, filters)
+        self.list_view.verticalScrollBar().setValue(scroll_value)
+
+        if self.model.total:
+            self.count_label.setText(f"{self.model.total} tasks")
         else:
-            for task in current_tasks:
-                item = HistoryItem(task)
-                item.regenerateRequested.connect(self.on_regenerate_requested)
-                self.vbox.addWidget(item)
-        
-        # Update Pagination Controls
-        self.page_label.setText(f"{self.current_page} / {total_pages}")
-        self.prev_btn.setEnabled(self.current_page > 1)
-        self.next_btn.setEnabled(self.current_page < total_pages)
+            self.count_label.setText("No matching tasks." if query or filters else "No history yet.")
+
+    def retain_visible_thumbnails(self):
+        viewport = self.list_view.viewport().rect()
+        first = self.list_view.indexAt(viewport.topLeft())
+        last = self.list_view.indexAt(viewport.bottomLeft())
+        if not first.isValid():
+            return
+        last_row = last.row() if last.isValid() else self.model.rowCount() - 1
+        paths = set()
+        for row in range(first.row(), last_row + 1):
+            task = self.model.task_at(row)
+            if task is not None and has_result(task):
+                paths.add(task["result_path"])
+        self.thumbnail_loader.retain(paths)
+
+    def show_details(self, task_data):
+        w = TaskDetailsDialog(task_data, self.window())
+        w.exec_()
+
+    def open_image(self, task_data):
+        if task_data["result_path"] and os.path.exists(task_data["result_path"]):
+            # Open with system default viewer
+            QDesktopServices.openUrl(QUrl.fromLocalFile(task_data["result_path"]))
+
+    def open_folder(self, task_data):
+        if task_data["result_path"]:
+            folder = os.path.dirname(task_data["result_path"])
+            QDesktopServices.openUrl(QUrl.fromLocalFile(folder))
 
     def on_regenerate_requested(self, task_data):
         # Signal up to main window
@@ -0,0 +1,90 @@
+import os
+from collections import OrderedDict
+
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QImageReader, QPixmap
+
+from core.config import cfg
+
+class ImageCache:
+    """Process-wide pixmap cache shared by every widget that shows images.
+
+    Entries are keyed by (path, mtime, file size, target size), so a changed
+    file is never served stale. A target size scales the image down until it
+    covers that size (keeping the aspect ratio); None keeps the full
+    resolution. Pixmaps are evicted least recently used first once they
+    exceed image_cache_mb.
+
+    Not thread safe, and QPixmap is UI-thread only anyway: use it from the UI
+    thread and decode elsewhere with read_image().
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes if max_bytes is not None else cfg.get("image_cache_mb") * 1024 * 1024
+        self.entries = OrderedDict()
+        self.bytes = 0
+
+    def key(self, path, size=None):
+        try:
+            st = os.stat(path)
+        except (OSError, TypeError):
+            return None
+        target = (size.width(), size.height()) if size is not None else None
+        return (os.path.abspath(path), st.st_mtime_ns, st.st_size, target)
+
+    def get(self, path, size=None):
+        """Cached pixmap for path at size, or None. Does not touch the disk beyond a stat."""
+        key = self.key(path, size)
+        pixmap = self.entries.get(key) if key is not None else None
+        if pixmap is None:
+            return None
+        self.entries.move_to_end(key)
+        return pixmap
+
+    def put(self, path, size, pixmap):
+        key = self.key(path, size)
+        if key is None or pixmap.isNull():
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.bytes -= _pixmap_bytes(old)
+        cost = _pixmap_bytes(pixmap)
+        if cost > self.max_bytes:
+            return
+        self.entries[key] = pixmap
+        self.bytes += cost
+        while self.bytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= _pixmap_bytes(evicted)
+
+    def load(self, path, size=None):
+        """Cached pixmap for path at size, decoding it on this thread on a miss.
+
+        Returns a null QPixmap when the file is missing or unreadable.
+        """
+        pixmap = self.get(path, size)
+        if pixmap is not None:
+            return pixmap
+        image = read_image(path, size)
+        pixmap = QPixmap.fromImage(image) if not image.isNull() else QPixmap()
+        self.put(path, size, pixmap)
+        return pixmap
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+def _pixmap_bytes(pixmap):
+    return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+def read_image(path, size=None):
+    """Decode path (a file name or an open QIODevice) into a QImage, scaled while
+    decoding to cover size when given. Safe off the UI thread."""
+    reader = QImageReader(path)
+    if size is not None:
+        source = reader.size()
+        if source.isValid() and (source.width() > size.width() or source.height() > size.height()):
+            reader.setScaledSize(source.scaled(size, Qt.KeepAspectRatioByExpanding))
+    return reader.read()
+
+image_cache = ImageCache()
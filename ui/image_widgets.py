@@ -0,0 +1,474 @@
+import math
+import os
+import threading
+from PySide6.QtCore import Qt, Signal, QSize, QTimer, QObject, QRunnable, QThreadPool, QBuffer, QByteArray, QIODevice
+from PySide6.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QFileDialog, QFrame, QScrollArea
+from PySide6.QtGui import QDragEnterEvent, QDropEvent, QImage, QPixmap
+from qfluentwidgets import InfoBar, InfoBarPosition, FluentIcon, TransparentToolButton
+
+from core.partial_image import preview_bytes
+from ui.image_cache import image_cache, read_image
+from ui.thumbnail_loader import ThumbnailLoader
+
+class ImageThumbnail(QWidget):
+    """Reference image tile. The owner decodes the image and hands it over with set_pixmap()."""
+    removed = Signal(str)
+    SIDE = 100
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.setFixedSize(self.SIDE, self.SIDE)
+        
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0,0,0,0)
+        
+        self.img_label = QLabel()
+        self.img_label.setAlignment(Qt.AlignCenter)
+        self.img_label.setStyleSheet("border-radius: 8px; border: 1px solid #ddd;")
+        
+        layout.addWidget(self.img_label)
+        
+        # Close button overlay
+        self.close_btn = TransparentToolButton(FluentIcon.CLOSE, self)
+        self.close_btn.setFixedSize(24, 24)
+        self.close_btn.move(72, 4)
+        self.close_btn.clicked.connect(self.on_remove)
+
+    def set_pixmap(self, pixmap):
+        # The pixmap covers the tile at device resolution, show its center
+        side = min(pixmap.width(), pixmap.height())
+        tile = pixmap.copy((pixmap.width() - side) // 2, (pixmap.height() - side) // 2, side, side)
+        tile.setDevicePixelRatio(side / self.SIDE)
+        self.img_label.setPixmap(tile)
+        
+    def on_remove(self):
+        self.removed.emit(self.path)
+
+class _EncodeSignals(QObject):
+    encoded = Signal(str, QImage)
+
+class _EncodeTask(QRunnable):
+    """Encodes a pasted or dropped image to PNG once and renders its tile.
+
+    data holds the PNG bytes once run() is done; the decoded image is dropped
+    then so only the compressed buffer stays in memory, or error holds why the
+    encode failed. result() waits for them off the UI thread.
+    """
+    def __init__(self, key, image, side, signals):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.key = key
+        self.image = image
+        self.side = side
+        self.signals = signals
+        self.data = None
+        self.error = None
+        self._started = False
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def result(self):
+        """The PNG bytes; encodes on the calling thread if the pool has not started yet.
+
+        Raises the error the encode failed with.
+        """
+        self.run()
+        self._done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.data
+
+    def run(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        try:
+            buffer = QBuffer()
+            buffer.open(QIODevice.WriteOnly)
+            if not self.image.save(buffer, "PNG"):
+                raise ValueError("could not encode the image as PNG")
+            tile = self.image.scaled(self.side, self.side, Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
+            self.data = bytes(buffer.data())
+        except Exception as e:
+            self.error = e
+            return
+        finally:
+            self.image = None
+            # Waiters in result() must wake up whether or not the encode worked
+            self._done.set()
+        self.signals.encoded.emit(self.key, tile)
+
+class ImageDropArea(QFrame):
+    """Reference image picker: files, drag and drop, and clipboard pastes.
+
+    Pasted and dropped image data is kept in memory and encoded to PNG once
+    in the background; nothing is written to disk until a task is submitted
+    and the asset store keeps it under its hash. image_paths lists every
+    reference in order, with a "pasted-image-N" key for in-memory images;
+    references() resolves those keys to their PNG bytes.
+    """
+    imageDropped = Signal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setAcceptDrops(True)
+        self.setFrameStyle(QFrame.StyledPanel | QFrame.Sunken)
+        self.setStyleSheet("QFrame { border: 2px dashed #aaa; border-radius: 10px; background-color: transparent; }")
+        
+        self.layout = QVBoxLayout(self)
+        self.layout.setContentsMargins(0, 0, 0, 0)
+        
+        # Container for content
+        self.content_widget = QWidget(self)
+        self.content_layout = QVBoxLayout(self.content_widget)
+        self.content_layout.setAlignment(Qt.AlignCenter)
+        
+        self.label = QLabel("Drag & Drop Images Here\n(Max 13)\nOr Click to Select\n(Ctrl+V to Paste)")
+        self.label.setAlignment(Qt.AlignCenter)
+        self.content_layout.addWidget(self.label)
+        
+        # Scroll Area for thumbnails
+        self.scroll_area = QScrollArea()
+        self.scroll_area.setWidgetResizable(True)
+        self.scroll_area.setStyleSheet("background: transparent; border: none;")
+        self.scroll_area.setFixedHeight(120)
+        self.scroll_area.hide()
+        
+        self.scroll_content = QWidget()
+        self.scroll_content.setStyleSheet("background: transparent;")
+        self.scroll_layout = QHBoxLayout(self.scroll_content)
+        self.scroll_layout.setAlignment(Qt.AlignLeft)
+        self.scroll_layout.setContentsMargins(10, 5, 10, 5)
+        self.scroll_layout.setSpacing(10)
+        
+        self.scroll_area.setWidget(self.scroll_content)
+        self.content_layout.addWidget(self.scroll_area)
+        
+        self.layout.addWidget(self.content_widget)
+        
+        # Clear All button (top right)
+        self.clear_btn = TransparentToolButton(FluentIcon.DELETE, self)
+        self.clear_btn.setFixedSize(30, 30)
+        self.clear_btn.setToolTip("Clear All Images")
+        self.clear_btn.move(self.width() - 35, 5)
+        self.clear_btn.clicked.connect(self.clear_images)
+        self.clear_btn.hide()
+        
+        # Paste button (bottom right)
+        self.paste_btn = TransparentToolButton(FluentIcon.PASTE, self)
+        self.paste_btn.setFixedSize(30, 30)
+        self.paste_btn.setToolTip("Paste from Clipboard")
+        self.paste_btn.clicked.connect(self.paste_from_clipboard)
+        
+        self.image_paths = []
+        self.thumbnail_loader = None
+        self.pasted_images = {}  # key in image_paths -> _EncodeTask
+        self.pasted_count = 0
+        self.encode_pool = QThreadPool(self)
+        self.encode_signals = _EncodeSignals(self)
+        self.encode_signals.encoded.connect(self.on_image_encoded)
+
+    def resizeEvent(self, event):
+        self.clear_btn.move(self.width() - 35, 5)
+        self.paste_btn.move(self.width() - 35, self.height() - 35)
+        super().resizeEvent(event)
+
+    def paste_from_clipboard(self):
+        clipboard = QApplication.clipboard()
+        mime_data = clipboard.mimeData()
+        
+        if mime_data.hasImage():
+            image = clipboard.image()
+            if not image.isNull():
+                self.add_image_data(image)
+                InfoBar.success(title="Pasted", content="Image pasted from clipboard.", parent=self, position=InfoBarPosition.TOP_RIGHT)
+                return
+
+        if mime_data.hasUrls():
+            for url in mime_data.urls():
+                path = url.toLocalFile()
+                if path.lower().endswith(('.png', '.jpg', '.jpeg', '.webp')):
+                    self.add_image(path)
+            InfoBar.success(title="Pasted", content="Image file(s) pasted from clipboard.", parent=self, position=InfoBarPosition.TOP_RIGHT)
+            return
+        
+        InfoBar.warning(title="No Image", content="No image found in clipboard.", parent=self, position=InfoBarPosition.TOP_RIGHT)
+
+    def dragEnterEvent(self, event: QDragEnterEvent):
+        if event.mimeData().hasUrls() or event.mimeData().hasImage():
+            event.accept()
+        else:
+            event.ignore()
+
+    def dropEvent(self, event: QDropEvent):
+        if event.mimeData().hasUrls():
+            for url in event.mimeData().urls():
+                path = url.toLocalFile()
+                if path.lower().endswith(('.png', '.jpg', '.jpeg', '.webp')):
+                    self.add_image(path)
+        elif event.mimeData().hasImage():
+            image = event.mimeData().imageData()
+            if isinstance(image, QPixmap):
+                image = image.toImage()
+            if isinstance(image, QImage) and not image.isNull():
+                self.add_image_data(image)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            # If clicking on empty space, open dialog
+            # But we have thumbnails now, so we need to be careful not to block them?
+            # The thumbnails are in scroll_area which is a child.
+            # If we click on the frame but not on a child widget...
+            # Actually QScrollArea will handle its own clicks.
+            
+            fnames, _ = QFileDialog.getOpenFileNames(self, 'Open files', '', "Image files (*.jpg *.jpeg *.png *.webp)")
+            if fnames:
+                for fname in fnames:
+                    self.add_image(fname)
+
+    def add_image_data(self, image):
+        """Add an image that has no file, e.g. from the clipboard."""
+        self.pasted_count += 1
+        self.add_image(f"pasted-image-{self.pasted_count}", image)
+
+    def add_image(self, path, image=None):
+        if len(self.image_paths) >= 13:
+            InfoBar.warning(title="Limit Reached", content="Maximum 13 images allowed.", parent=self, position=InfoBarPosition.TOP_RIGHT)
+            return
+            
+        if path in self.image_paths:
+             return
+
+        self.image_paths.append(path)
+        thumb = ImageThumbnail(path)
+        thumb.removed.connect(self.remove_image)
+        self.scroll_layout.addWidget(thumb)
+        if image is not None:
+            task = _EncodeTask(path, image, self.loader().size.width(), self.encode_signals)
+            self.pasted_images[path] = task
+            self.encode_pool.start(task)
+        else:
+            # Decoded in the background at tile size; the full file is only read on submit
+            pixmap = self.loader().pixmap(path)
+            if pixmap is not None:
+                thumb.set_pixmap(pixmap)
+        self.update_ui_state()
+        self.imageDropped.emit(path)
+
+    def loader(self):
+        if self.thumbnail_loader is None:
+            side = math.ceil(ImageThumbnail.SIDE * self.devicePixelRatioF())
+            # References are the user's own files, keep them out of the output thumbnail cache
+            self.thumbnail_loader = ThumbnailLoader(QSize(side, side), disk_cache=False, parent=self)
+            self.thumbnail_loader.loaded.connect(self.on_thumbnail_loaded)
+        return self.thumbnail_loader
+
+    def thumbnail(self, path):
+        for i in range(self.scroll_layout.count()):
+            widget = self.scroll_layout.itemAt(i).widget()
+            if isinstance(widget, ImageThumbnail) and widget.path == path:
+                return widget
+        return None
+
+    def on_thumbnail_loaded(self, path):
+        thumb = self.thumbnail(path)
+        pixmap = image_cache.get(path, self.thumbnail_loader.size)
+        if thumb is not None and pixmap is not None:
+            thumb.set_pixmap(pixmap)
+
+    def on_image_encoded(self, key, tile):
+        thumb = self.thumbnail(key) if key in self.pasted_images else None
+        if thumb is not None:
+            thumb.set_pixmap(QPixmap.fromImage(tile))
+
+    def references(self):
+        """Every reference in order: a file path, or for pasted and dropped images
+        the encode task, whose result() gives the PNG bytes (see PrepareReferencesThread)."""
+        return [self.pasted_images.get(path, path) for path in self.image_paths]
+
+    def remove_image(self, path):
+        if path in self.image_paths:
+            self.image_paths.remove(path)
+            task = self.pasted_images.pop(path, None)
+            if task is not None:
+                self.encode_pool.tryTake(task)
+            # Find widget and remove
+            widget = self.thumbnail(path)
+            if widget is not None:
+                widget.deleteLater()
+            if self.thumbnail_loader is not None:
+                self.thumbnail_loader.retain(self.image_paths)
+            self.update_ui_state()
+
+    def clear_images(self):
+        self.image_paths = []
+        self.pasted_images = {}
+        self.encode_pool.clear()
+        # Clear widgets
+        while self.scroll_layout.count():
+            item = self.scroll_layout.takeAt(0)
+            if item.widget():
+                item.widget().deleteLater()
+        if self.thumbnail_loader is not None:
+            self.thumbnail_loader.retain(self.image_paths)
+        self.update_ui_state()
+        self.imageDropped.emit("")
+
+    def update_ui_state(self):
+        if self.image_paths:
+            self.label.hide()
+            self.scroll_area.show()
+            self.clear_btn.show()
+            self.clear_btn.raise_()
+        else:
+            self.label.show()
+            self.scroll_area.hide()
+            self.clear_btn.hide()
+
+class _PartialDecodeSignals(QObject):
+    decoded = Signal(int, QImage)
+
+class _PartialDecodeTask(QRunnable):
+    """Decodes what has arrived so far of a download, for AspectRatioLabel.setPartialImage()."""
+    def __init__(self, generation, path, size, signals):
+        super().__init__()
+        self.generation = generation
+        self.path = path
+        self.size = size
+        self.signals = signals
+
+    def run(self):
+        image = QImage()
+        try:
+            with open(self.path, "rb") as f:
+                data = preview_bytes(f.read())
+        except OSError:
+            data = None  # The download finished and the file was renamed meanwhile
+        if data:
+            buffer = QBuffer()
+            buffer.setData(QByteArray(data))
+            buffer.open(QIODevice.ReadOnly)
+            image = read_image(buffer, self.size)
+        self.signals.decoded.emit(self.generation, image)
+
+class AspectRatioLabel(QLabel):
+    """Preview label that keeps its image scaled to fit, aspect ratio intact.
+
+    The image is decoded at no more than screen resolution and kept as a small
+    pyramid of halved copies. While the label is being resized the nearest
+    level is scaled with a fast transform; one smooth rescale follows once the
+    resize has settled for SETTLE_MS.
+
+    setPartialImage() previews an image that is still downloading; those
+    decodes run in the background, one at a time, and are dropped once
+    setImage() is called.
+    """
+    SETTLE_MS = 150
+    MIN_LEVEL_SIDE = 256
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setAlignment(Qt.AlignCenter)
+        self.setStyleSheet("background-color: #f0f0f0; border: 1px solid #ddd; border-radius: 8px;")
+        self._levels = []  # Largest first, each half the size of the previous one
+        self._settle_timer = QTimer(self)
+        self._settle_timer.setSingleShot(True)
+        self._settle_timer.setInterval(self.SETTLE_MS)
+        self._settle_timer.timeout.connect(self.update_pixmap)
+        self._generation = 0  # Bumped by setImage() so late partial decodes are ignored
+        self._partial_path = None  # Waiting for the running partial decode to finish
+        self._partial_busy = False
+        self._partial_signals = _PartialDecodeSignals(self)
+        self._partial_signals.decoded.connect(self.on_partial_decoded)
+
+    def setImage(self, path):
+        self._settle_timer.stop()
+        self._generation += 1
+        self._partial_path = None
+        if path and os.path.exists(path):
+            self._levels = build_pyramid(image_cache.load(path, self._max_size()), self.MIN_LEVEL_SIDE)
+            self.update_pixmap()
+        else:
+            self._levels = []
+            self.clear()
+
+    def setPartialImage(self, part_path):
+        """Show the part of an image that has been downloaded to part_path so far."""
+        self._partial_path = part_path
+        if not self._partial_busy:
+            self._start_partial_decode()
+
+    def _start_partial_decode(self):
+        path, self._partial_path = self._partial_path, None
+        self._partial_busy = True
+        QThreadPool.globalInstance().start(_PartialDecodeTask(self._generation, path, self._max_size(), self._partial_signals))
+
+    def on_partial_decoded(self, generation, image):
+        self._partial_busy = False
+        if generation != self._generation:
+            return
+        if not image.isNull():
+            self._levels = build_pyramid(QPixmap.fromImage(image), self.MIN_LEVEL_SIDE)
+            self.update_pixmap()
+        if self._partial_path is not None:
+            self._start_partial_decode()
+
+    def _max_size(self):
+        # Nothing larger than the screen can ever be shown
+        screen = self.screen() or QApplication.primaryScreen()
+        if screen is None:
+            return None
+        return screen.size() * screen.devicePixelRatio()
+
+    def resizeEvent(self, event):
+        self.update_pixmap(smooth=False)
+        self._settle_timer.start()
+        super().resizeEvent(event)
+
+    def update_pixmap(self, smooth=True):
+        if not self._levels or self._levels[0].isNull():
+            return
+        # Use a slightly smaller size to ensure borders are visible
+        target_size = self.size() - QSize(4, 4)
+        fitted = self._levels[0].size().scaled(target_size, Qt.KeepAspectRatio)
+        # Smallest level that still covers the target, so nothing is scaled up
+        source = self._levels[0]
+        for level in self._levels[1:]:
+            if level.width() < fitted.width() or level.height() < fitted.height():
+                break
+            source = level
+        mode = Qt.SmoothTransformation if smooth else Qt.FastTransformation
+        super().setPixmap(source.scaled(target_size, Qt.KeepAspectRatio, mode))
+
+def build_pyramid(pixmap, min_side):
+    """pixmap followed by smoothly halved copies down to about min_side; at most 4/3 of its memory."""
+    levels = [pixmap]
+    while not pixmap.isNull() and min(pixmap.width(), pixmap.height()) // 2 >= min_side:
+        pixmap = pixmap.scaled(pixmap.width() // 2, pixmap.height() // 2, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+        levels.append(pixmap)
+    return levels
+
+class ModernToggleButton(TransparentToolButton):
+    """Modern toggle button for preview panel"""
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFixedSize(24, 24)
+        self.is_expanded = True  # True means right panel is visible
+        self.update_icon()
+    
+    def update_icon(self):
+        """Update icon based on expanded state"""
+        if self.is_expanded:
+            self.setIcon(FluentIcon.PAGE_RIGHT)
+            self.setToolTip("Collapse Preview")
+        else:
+            self.setIcon(FluentIcon.PAGE_LEFT)
+            self.setToolTip("Expand Preview")
+    
+    def set_expanded(self, expanded: bool):
+        """Set the expanded state and update the icon"""
+        self.is_expanded = expanded
+        self.update_icon()
@@ -0,0 +1,31 @@
+from PySide6.QtWidgets import QWidget, QVBoxLayout
+
+from core.startup_timer import startup_timer
+
+class LazyPage(QWidget):
+    """Navigation entry whose page is only built the first time it is shown.
+
+    factory() imports and constructs the page, so its module and everything
+    that module pulls in (requests, the task engine, the history) stay
+    unloaded until the page is opened. page() builds it on demand, e.g. to
+    fill in a form before switching to it.
+    """
+
+    def __init__(self, object_name, factory, parent=None):
+        super().__init__(parent)
+        self.setObjectName(object_name)
+        self.factory = factory
+        self._page = None
+        self._layout = QVBoxLayout(self)
+        self._layout.setContentsMargins(0, 0, 0, 0)
+
+    def page(self):
+        if self._page is None:
+            with startup_timer.phase(f"page {self.objectName()}"):
+                self._page = self.factory()
+            self._layout.addWidget(self._page)
+        return self._page
+
+    def showEvent(self, event):
+        self.page()
+        super().showEvent(event)
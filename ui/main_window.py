@@ -1,28 +1,52 @@
+import os
 from PySide6.QtGui import QIcon
 from PySide6.QtWidgets import QApplication
 from qfluentwidgets import FluentWindow, NavigationItemPosition, FluentIcon, SplashScreen
 
-from ui.banana_generator_page import BananaGeneratorPage
-from ui.gpt_image_generator_page import GptImageGeneratorPage
-from ui.history_page import HistoryPage
-from ui.settings_page import SettingsPage
+from core.startup_timer import startup_timer
+from ui.lazy_page import LazyPage
 
 class MainWindow(FluentWindow):
     def __init__(self):
         super().__init__()
         self.initWindow()
 
-        # Create sub interfaces
-        self.banana_generator_interface = BananaGeneratorPage(self)
-        self.gpt_generator_interface = GptImageGeneratorPage(self)
-        self.history_interface = HistoryPage()
-        self.settings_interface = SettingsPage()
+        # Create sub interfaces, each page is built the first time it is shown
+        self.banana_generator_interface = LazyPage("BananaGeneratorPage", self.create_banana_generator_page)
+        self.gpt_generator_interface = LazyPage("GptImageGeneratorPage", self.create_gpt_generator_page)
+        self.batch_interface = LazyPage("BatchPage", self.create_batch_page)
+        self.history_interface = LazyPage("HistoryPage", self.create_history_page)
+        self.settings_interface = LazyPage("SettingsPage", self.create_settings_page)
 
         self.initNavigation()
         # Set initial window title based on default interface
         self.update_window_title(self.banana_generator_interface)
         # self.splashScreen.finish()
 
+    def create_banana_generator_page(self):
+        from ui.banana_generator_page import BananaGeneratorPage
+        return BananaGeneratorPage(self)
+
+    def create_gpt_generator_page(self):
+        from ui.gpt_image_generator_page import GptImageGeneratorPage
+        return GptImageGeneratorPage(self)
+
+    def create_batch_page(self):
+        from ui.batch_page import BatchPage
+        return BatchPage()
+
+    def create_history_page(self):
+        from ui.history_page import HistoryPage
+        return HistoryPage()
+
+    def create_settings_page(self):
+        from ui.settings_page import SettingsPage
+        return SettingsPage()
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        startup_timer.finish()
+
     def initWindow(self):
         self.resize(1100, 750)
         self.setMinimumWidth(450)  # Left panel (400) + Navigation (50)
@@ -38,6 +62,7 @@ class MainWindow(FluentWindow):
         self.addSubInterface(self.gpt_generator_interface, FluentIcon.PHOTO, 'GPT Image')
         #self.addSubInterface(self.sora_generator_interface, FluentIcon.VIDEO, 'Sora')
         #self.addSubInterface(self.veo_generator_interface, FluentIcon.VIDEO, 'Veo')
+        self.addSubInterface(self.batch_interface, FluentIcon.DOCUMENT, 'Batch')
         self.addSubInterface(self.history_interface, FluentIcon.HISTORY, 'History')
         self.addSubInterface(self.settings_interface, FluentIcon.SETTING, 'Settings', position=NavigationItemPosition.BOTTOM)
 
@@ -54,6 +79,8 @@ class MainWindow(FluentWindow):
             self.setWindowTitle(f'{base_title} - Nano Banana')
         elif interface == self.gpt_generator_interface:
             self.setWindowTitle(f'{base_title} - GPT Image')
+        elif interface == self.batch_interface:
+            self.setWindowTitle(f'{base_title} - Batch')
         elif interface == self.history_interface:
             self.setWindowTitle(f'{base_title} - History')
         elif interface == self.settings_interface:
@@ -62,51 +89,59 @@ class MainWindow(FluentWindow):
             self.setWindowTitle(base_title)
 
     def regenerate_task(self, task_data):
+        from core.asset_store import asset_store
+
         # Determine which interface to use based on API type
         api_type = task_data.get('api_type', 'nano_banana')
         
         if api_type == 'gpt_image':
             # Switch to GPT Image generator page
             self.switchTo(self.gpt_generator_interface)
+            page = self.gpt_generator_interface.page()
             
             # Populate fields
-            self.gpt_generator_interface.prompt_edit.setText(task_data['prompt'])
-            self.gpt_generator_interface.model_combo.setCurrentText(task_data['model'])
-            self.gpt_generator_interface.size_combo.setCurrentText(task_data['size'])
-            self.gpt_generator_interface.variants_combo.setCurrentText(str(task_data['variants']))
+            page.prompt_edit.setText(task_data['prompt'])
+            page.model_combo.setCurrentText(task_data['model'])
+            page.size_combo.setCurrentText(task_data['size'])
+            page.variants_combo.setCurrentText(str(task_data['variants']))
             
             # Handle reference image if it exists
             # Clear existing images first
-            self.gpt_generator_interface.drop_area.clear_images()
+            page.drop_area.clear_images()
             
             if task_data.get('ref_images'):
                 ref_imgs = task_data['ref_images']
                 if isinstance(ref_imgs, str):
-                    self.gpt_generator_interface.drop_area.add_image(ref_imgs)
-                elif isinstance(ref_imgs, list):
-                    for img_path in ref_imgs:
-                        self.gpt_generator_interface.drop_area.add_image(img_path)
+                    ref_imgs = [ref_imgs]
+                # Entries are asset hashes, or file paths in older records
+                for ref in ref_imgs:
+                    img_path = asset_store.resolve(ref)
+                    if img_path and os.path.exists(img_path):
+                        page.drop_area.add_image(img_path)
         else:
             # Switch to Nano Banana generator page
             self.switchTo(self.banana_generator_interface)
+            page = self.banana_generator_interface.page()
             
             # Populate fields
-            self.banana_generator_interface.prompt_edit.setText(task_data['prompt'])
-            self.banana_generator_interface.model_combo.setCurrentText(task_data['model'])
-            self.banana_generator_interface.ratio_combo.setCurrentText(task_data['aspect_ratio'])
-            self.banana_generator_interface.size_combo.setCurrentText(task_data['image_size'])
+            page.prompt_edit.setText(task_data['prompt'])
+            page.model_combo.setCurrentText(task_data['model'])
+            page.ratio_combo.setCurrentText(task_data['aspect_ratio'])
+            page.size_combo.setCurrentText(task_data['image_size'])
             
             # Handle reference image if it exists
             # Clear existing images first
-            self.banana_generator_interface.drop_area.clear_images()
+            page.drop_area.clear_images()
             
             if task_data.get('ref_images'):
                 ref_imgs = task_data['ref_images']
                 if isinstance(ref_imgs, str):
-                    self.banana_generator_interface.drop_area.add_image(ref_imgs)
-                elif isinstance(ref_imgs, list):
-                    for img_path in ref_imgs:
-                        self.banana_generator_interface.drop_area.add_image(img_path)
+                    ref_imgs = [ref_imgs]
+                # Entries are asset hashes, or file paths in older records
+                for ref in ref_imgs:
+                    img_path = asset_store.resolve(ref)
+                    if img_path and os.path.exists(img_path):
+                        page.drop_area.add_image(img_path)
         
         # Do not trigger generation automatically, let user decide
         # self.generator_interface.on_generate()
@@ -0,0 +1,42 @@
+from concurrent.futures import CancelledError
+
+from PySide6.QtCore import QThread, Signal
+
+from core.reference_encoder import prepare_references
+
+class PrepareReferencesThread(QThread):
+    """Reads and encodes reference images off the UI thread.
+
+    paths holds file paths and encode tasks from ImageDropArea.references().
+
+    finished_signal carries (data_uris, asset_hashes, errors, cancelled).
+    """
+    progress = Signal(int, int)
+    finished_signal = Signal(list, list, list, bool)
+
+    def __init__(self, paths):
+        super().__init__()
+        self.paths = paths
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        refs = []
+        failed = []
+        try:
+            for ref in self.paths:
+                if isinstance(ref, str):
+                    refs.append(ref)
+                    continue
+                # Pasted images come as encode tasks that may still be running
+                try:
+                    refs.append(ref.result())
+                except Exception as e:
+                    failed.append(f"{ref.key}: {e}")
+            urls, hashes, errors = prepare_references(refs, self.progress.emit, lambda: self._cancelled)
+        except CancelledError:
+            self.finished_signal.emit([], [], [], True)
+            return
+        self.finished_signal.emit(urls, hashes, failed + errors, self._cancelled)
@@ -0,0 +1,49 @@
+from PySide6.QtCore import QObject, Signal
+
+class TaskSignals(QObject):
+    """Task engine listener that re-emits engine callbacks as Qt signals.
+
+    The engine calls these from its own thread; the signals are queued onto the
+    UI thread, so connected slots can touch widgets directly.
+    """
+    submitted = Signal(dict)
+    update_signal = Signal(int, str)
+    download_signal = Signal(int, int)
+    partial_signal = Signal(int, str)
+    variant_signal = Signal(int, str)
+    finished_signal = Signal(str, bool, str, str)
+
+    def on_submitted(self, result):
+        self.submitted.emit(result)
+
+    def on_update(self, task_id, progress, status):
+        self.update_signal.emit(int(progress or 0), str(status))
+
+    def on_download_progress(self, task_id, received, total):
+        self.download_signal.emit(received, total)
+
+    def on_partial_image(self, task_id, index, part_path):
+        self.partial_signal.emit(index, part_path)
+
+    def on_variant_ready(self, task_id, index, result_path):
+        self.variant_signal.emit(index, result_path)
+
+    def on_finished(self, task_id, success, result_path, msg):
+        # task_id is None when the submit response carried no id
+        self.finished_signal.emit(task_id or "", success, result_path, msg)
+
+class HistorySignals(QObject):
+    """Re-emits history_mgr callbacks, which run on its loading threads, as Qt signals."""
+    ready = Signal()
+    searchable = Signal()
+
+class BatchSignals(QObject):
+    """BatchRunner listener that re-emits its callbacks as Qt signals."""
+    row_finished = Signal(int, dict)
+    finished_signal = Signal(dict)
+
+    def on_row_finished(self, index, result):
+        self.row_finished.emit(index, result)
+
+    def on_batch_finished(self, stats):
+        self.finished_signal.emit(stats)
@@ -0,0 +1,99 @@
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QSize, Signal, Slot
+from PySide6.QtGui import QImage, QPixmap, QColor, QPainter
+
+from core.thumbnail_cache import thumbnail_cache
+from ui.image_cache import image_cache, read_image
+
+def make_thumbnail(source, dest, side):
+    """Thumbnail generator for core.thumbnail_cache: shorter side scaled to side, saved as JPEG."""
+    image = read_image(source, QSize(side, side))
+    if image.isNull():
+        return False
+    if image.hasAlphaChannel():
+        # JPEG has no alpha, flatten onto white like the card background
+        flat = QImage(image.size(), QImage.Format_RGB32)
+        flat.fill(QColor("white"))
+        painter = QPainter(flat)
+        painter.drawImage(0, 0, image)
+        painter.end()
+        image = flat
+    return image.save(dest, "JPG", 85)
+
+# Lets the task engine render thumbnails right after a download
+thumbnail_cache.set_generator(make_thumbnail)
+
+class _DecodeSignals(QObject):
+    decoded = Signal(str, QImage)
+
+class _DecodeTask(QRunnable):
+    def __init__(self, path, size, signals, disk_cache):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.path = path
+        self.size = size
+        self.signals = signals
+        self.disk_cache = disk_cache
+
+    def run(self):
+        cached = None
+        if self.disk_cache:
+            # The on-disk cache turns repeat visits into small JPEG reads
+            cached = thumbnail_cache.ensure(self.path, max(self.size.width(), self.size.height()))
+        self.signals.decoded.emit(self.path, read_image(cached or self.path, self.size))
+
+class ThumbnailLoader(QObject):
+    """Decodes thumbnails on a worker pool into the shared image cache.
+
+    pixmap(path) returns the cached pixmap, or None and queues a decode;
+    loaded(path) is emitted once it is ready. retain(paths) drops queued
+    decodes for every other path, e.g. rows that scrolled out of view.
+
+    With disk_cache the thumbnails also go to core.thumbnail_cache, which is
+    meant for output images; other images are decoded from the source only.
+    """
+    loaded = Signal(str)
+
+    def __init__(self, size=QSize(176, 176), max_threads=2, disk_cache=True, parent=None):
+        super().__init__(parent)
+        self.size = size
+        self.disk_cache = disk_cache
+        self.failed = set()
+        self.pending = {}
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self.signals = _DecodeSignals(self)
+        self.signals.decoded.connect(self.on_decoded)
+
+    def pixmap(self, path):
+        pixmap = image_cache.get(path, self.size)
+        if pixmap is not None:
+            return pixmap
+        if path not in self.pending and path not in self.failed:
+            task = _DecodeTask(path, self.size, self.signals, self.disk_cache)
+            self.pending[path] = task
+            self.pool.start(task)
+        return None
+
+    def has_failed(self, path):
+        return path in self.failed
+
+    def retain(self, paths):
+        """Cancel queued decodes that are not for one of paths."""
+        for path in list(self.pending):
+            if path not in paths and self.pool.tryTake(self.pending[path]):
+                del self.pending[path]
+
+    @Slot(str, QImage)
+    def on_decoded(self, path, image):
+        if self.pending.pop(path, None) is None:
+            return
+        if image.isNull():
+            self.failed.add(path)
+        else:
+            image_cache.put(path, self.size, QPixmap.fromImage(image))
+        self.loaded.emit(path)
+
+    def clear(self):
+        self.pool.clear()
+        self.pending.clear()
+        self.failed.clear()